@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import multiprocessing
+import random
+import re
+import resource
+import time
+from collections import OrderedDict
+import grpc
+import myitems_pb2
+import myitems_pb2_grpc
+from cache import ItemStore, LRUCache, NGramIndex
+
+
+# Benchmarks for the grpc-service.
+# Offline cache micro-benchmarks, no MongoDB or gRPC server needed:
+#   python benchmark.py name-search --sizes 1000 100000 1000000
+#   python benchmark.py memory --sizes 100000 1000000
+#   python benchmark.py cache-hit --size 100000 --hits 1000000
+# Load test against a running server (GRPC_SERVER_MODE=threaded vs aio), GetItem by random id:
+#   python benchmark.py load --address localhost:50051 --concurrency 1 10 50 200 --requests 5000
+# MongoDB latency for the load test: a TCP proxy delaying every reply of a standalone MongoDB (replica set members would be
+# discovered and reached directly), the server is started with MONGO_PORT=27018
+#   python benchmark.py mongo-proxy --listen 27018 --target localhost:27017 --delay-ms 20
+
+
+WORDS = ["wireless", "mouse", "keyboard", "monitor", "vertical", "gaming", "usb", "hub", "cable",
+         "laptop", "stand", "webcam", "headset", "speaker", "charger", "adapter", "dock", "pad"]
+
+
+def item_names(count, seed=42):
+
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        yield i, f"{' '.join(rng.sample(WORDS, 3)).title()} {i}"
+
+
+def make_items(count, seed=42):
+    return [myitems_pb2.Item(id=i, name=name) for i, name in item_names(count, seed)]
+
+
+def timed(func, repeat):
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+
+# --- Name search: linear regex scan vs. n-gram index ---
+def bench_name_search(sizes, repeat):
+
+    queries = ["mouse", "vertical gaming", "12345", "zzz"]
+    print(f"{'items':>10} {'query':>16} {'matches':>8} {'scan ms':>10} {'index ms':>10} {'speedup':>8}")
+
+    for size in sizes:
+
+        items = make_items(size)
+        cache = LRUCache(size)
+        for item in items:
+            cache.put(item.id, item)
+
+        # the first search builds the name index, later ones while MongoDB stays down reuse it
+        build_time, _ = timed(lambda: cache.search(queries[0]), 1)
+        print(f"{size:>10} {'(index build)':>16} {'':>8} {'':>10} {build_time * 1e3:>10.3f}")
+
+        for query in queries:
+
+            # previous GetItem behaviour: regex over every cached value
+            search_regex = re.compile(re.escape(query), re.IGNORECASE)
+            scan_time, scan_hits = timed(lambda: [item for item in items if search_regex.search(item.name)], repeat)
+            index_time, index_hits = timed(lambda: cache.search(query), repeat)
+
+            assert len(scan_hits) == len(index_hits)
+            print(f"{size:>10} {query:>16} {len(index_hits):>8} {scan_time * 1e3:>10.3f} {index_time * 1e3:>10.3f} {scan_time / index_time:>7.1f}x")
+
+
+
+# --- Memory: Item messages in an OrderedDict vs. the compact ItemStore ---
+def fill_layout(layout, size):
+
+    # previous LRUCache layout: OrderedDict of Item messages plus a dict of store times
+    if layout.startswith("items"):
+        items, stored_at = OrderedDict(), {}
+        for i, name in item_names(size):
+            items[i] = myitems_pb2.Item(id=i, name=name)
+            stored_at[i] = time.monotonic()
+        index = NGramIndex() if layout == "items+index" else None
+        if index is not None:
+            for i, item in items.items():
+                index.add(i, item.name)
+        return items, stored_at, index
+
+    if layout == "store":
+        store = ItemStore()
+        for i, name in item_names(size):
+            store.put(i, name, time.monotonic())
+        return store
+
+    cache = LRUCache(size)
+    for i, name in item_names(size):
+        cache.put(i, myitems_pb2.Item(id=i, name=name))
+
+    # a fallback search while MongoDB is down builds the name index
+    if layout == "cache+index":
+        cache.search("mouse")
+    return cache
+
+
+def measure_layout(layout, size):
+
+    # runs in a fresh process, protobuf messages live outside the Python allocator so peak RSS is measured (KiB on Linux)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    held = fill_layout(layout, size)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (after - before) * 1024 / size
+
+
+def bench_memory(sizes):
+
+    layouts = [("items", "Item messages (before)"), ("store", "ItemStore (after)"),
+               ("items+index", "before + name index"), ("cache", "LRUCache (after)"),
+               ("cache+index", "LRUCache after a fallback search")]
+
+    print(f"{'items':>10} {'layout':>40} {'bytes/item':>12}")
+    context = multiprocessing.get_context("spawn")
+
+    for size in sizes:
+        for layout, label in layouts:
+            with context.Pool(1) as pool:
+                per_item = pool.apply(measure_layout, (layout, size))
+            print(f"{size:>10} {label:>40} {per_item:>12.0f}")
+
+
+
+# --- GetItem by id cache hit: message built and serialized vs. pre-encoded response ---
+def bench_cache_hit(size, hits):
+
+    cache = LRUCache(size)
+    for item in make_items(size):
+        cache.put(item.id, item)
+
+    rng = random.Random(7)
+    keys = [rng.randint(1, size) for _ in range(hits)]
+
+    def build_and_serialize():
+        for key in keys:
+            myitems_pb2.GetItemResponse(result=True, requested_item=cache.get(key)).SerializeToString()
+
+    # grpc_service.serialize_response hands the bytes to gRPC as they are
+    def pre_encoded():
+        for key in keys:
+            cache.get_response(key)
+
+    print(f"{'items':>10} {'path':>28} {'ns/hit':>10}")
+
+    for label, run in (("message + serialize (before)", build_and_serialize), ("pre-encoded bytes (after)", pre_encoded)):
+        elapsed, _ = timed(run, 1)
+        print(f"{size:>10} {label:>28} {elapsed / hits * 1e9:>10.0f}")
+
+
+
+# --- Load test: GetItem throughput by number of concurrent requests ---
+async def run_load(address, concurrency, requests, id_range):
+
+    latencies = []
+    remaining = iter(range(requests))
+
+    async with grpc.aio.insecure_channel(address) as channel:
+
+        stub = myitems_pb2_grpc.ItemServiceStub(channel)
+        await channel.channel_ready()
+
+        async def worker():
+            for _ in remaining:
+                request = myitems_pb2.GetItemRequest(id=random.randint(1, id_range))
+                start = time.perf_counter()
+                try:
+                    async for _ in stub.GetItem(request, timeout=30.0):
+                        pass
+                except grpc.aio.AioRpcError as e:
+                    if e.code() != grpc.StatusCode.NOT_FOUND:
+                        raise
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def relay(reader, writer, delay):
+
+    # forwards chunks in order, each one `delay` seconds after it was read
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+
+    async def send():
+        while (entry := await chunks.get()) is not None:
+            due, chunk = entry
+            await asyncio.sleep(max(due - loop.time(), 0))
+            writer.write(chunk)
+            await writer.drain()
+        writer.close()
+
+    sender = asyncio.create_task(send())
+
+    try:
+        while chunk := await reader.read(65536):
+            chunks.put_nowait((loop.time() + delay, chunk))
+    except ConnectionError:
+        pass
+
+    chunks.put_nowait(None)
+    await sender
+
+
+async def run_mongo_proxy(listen, target, delay):
+
+    host, port = target.rsplit(":", 1)
+
+    async def handle(client_reader, client_writer):
+        mongo_reader, mongo_writer = await asyncio.open_connection(host, int(port))
+        # requests go through as they are, replies are delayed: every round trip costs `delay` more
+        await asyncio.gather(relay(client_reader, mongo_writer, 0), relay(mongo_reader, client_writer, delay), return_exceptions=True)
+
+    server = await asyncio.start_server(handle, "0.0.0.0", listen)
+    print(f"Delaying MongoDB {target} replies by {delay * 1e3:.0f} ms on port {listen}.")
+
+    async with server:
+        await server.serve_forever()
+
+
+def bench_load(address, levels, requests, id_range):
+
+    print(f"{'concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+
+    for concurrency in levels:
+        throughput, p50, p99 = asyncio.run(run_load(address, concurrency, requests, id_range))
+        print(f"{concurrency:>12} {throughput:>10.0f} {p50 * 1e3:>10.2f} {p99 * 1e3:>10.2f}")
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    name_search = commands.add_parser("name-search")
+    name_search.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    name_search.add_argument("--repeat", type=int, default=5)
+
+    cache_hit = commands.add_parser("cache-hit")
+    cache_hit.add_argument("--size", type=int, default=100000)
+    cache_hit.add_argument("--hits", type=int, default=1000000)
+
+    memory = commands.add_parser("memory")
+    memory.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+
+    load = commands.add_parser("load")
+    load.add_argument("--address", default="localhost:50051")
+    load.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    load.add_argument("--requests", type=int, default=5000)
+    load.add_argument("--id-range", type=int, default=1000000, help="ids are drawn from 1..id-range, larger than the cache forces MongoDB reads")
+
+    mongo_proxy = commands.add_parser("mongo-proxy")
+    mongo_proxy.add_argument("--listen", type=int, default=27018)
+    mongo_proxy.add_argument("--target", default="localhost:27017")
+    mongo_proxy.add_argument("--delay-ms", type=float, default=20.0)
+
+    args = parser.parse_args()
+
+    if args.command == "name-search":
+        bench_name_search(args.sizes, args.repeat)
+
+    elif args.command == "cache-hit":
+        bench_cache_hit(args.size, args.hits)
+
+    elif args.command == "memory":
+        bench_memory(args.sizes)
+
+    elif args.command == "load":
+        bench_load(args.address, args.concurrency, args.requests, args.id_range)
+
+    elif args.command == "mongo-proxy":
+        asyncio.run(run_mongo_proxy(args.listen, args.target, args.delay_ms / 1e3))
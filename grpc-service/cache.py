@@ -0,0 +1,999 @@
+import asyncio
+import math
+import threading
+import time
+from array import array
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from collections import OrderedDict, defaultdict, deque
+import myitems_pb2
+
+
+
+
+# --- N-gram Name Index ---
+class NGramIndex:
+
+    # Inverted index from lowercased character n-grams of item names to item ids.
+    # A substring query only has to verify the ids that contain all of its n-grams.
+
+    N = 3
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+
+
+    @classmethod
+    def grams(cls, text):
+        text = text.lower()
+        return {text[i:i + cls.N] for i in range(len(text) - cls.N + 1)}
+
+
+    def add(self, key, name):
+        for gram in self.grams(name):
+            self._postings[gram].add(key)
+
+
+    def remove(self, key, name):
+
+        for gram in self.grams(name):
+
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+
+            posting.discard(key)
+            if not posting:
+                del self._postings[gram]
+
+
+    def candidates(self, query):
+
+        # None -> query too short to use the index, caller has to scan
+        grams = self.grams(query)
+        if not grams:
+            return None
+
+        postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+        if not postings[0]:
+            return set()
+
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+
+        return result
+
+
+
+
+# --- Compact Item Store ---
+def varint_size(value):
+    return (max(value.bit_length(), 1) + 6) // 7
+
+
+
+
+class ItemStore:
+
+    # Item ids and names in LRU order without one Item message (and OrderedDict node) per entry.
+    # Every entry is a slot in flat arrays: id, offset and size of its record in a single bytearray arena,
+    # name length, store and expiry time and the prev / next slots of a circular recency list (slot 0 is its sentinel:
+    # next -> least, prev -> most recently used). Freed slots are chained through _next for reuse.
+    # A record is the encoded GetItemResponse of the item, so GetItem by id sends it without serializing;
+    # the UTF-8 name is its tail (fields are encoded in field number order, name is the last one set).
+    # The id -> slot dict is the only per-entry Python object, Items are built when read.
+    # Replaced and removed records leave garbage in the arena, it is compacted once garbage outweighs live records.
+    # Not thread-safe, LRUCache serializes access.
+
+    COMPACT_MIN_GARBAGE = 1 << 16
+
+    def __init__(self):
+        self.clear()
+
+
+    def clear(self):
+
+        self._slots = {}
+        self._ids = array("q", [0])
+        self._offsets = array("Q", [0])
+        self._sizes = array("I", [0])
+        self._lengths = array("I", [0])
+        self._stored_at = array("d", [0.0])
+        self._expires_at = array("d", [0.0])
+        self._prev = array("i", [0])
+        self._next = array("i", [0])
+        self._free = 0
+        self._arena = bytearray()
+        self._garbage = 0
+
+
+    def __len__(self):
+        return len(self._slots)
+
+
+    def __contains__(self, item_id):
+        return item_id in self._slots
+
+
+    def slot(self, item_id):
+        return self._slots.get(item_id)
+
+
+    def name(self, slot):
+        end = self._offsets[slot] + self._sizes[slot]
+        return self._arena[end - self._lengths[slot]:end].decode()
+
+
+    def response(self, slot):
+        offset = self._offsets[slot]
+        return bytes(self._arena[offset:offset + self._sizes[slot]])
+
+
+    def item(self, slot):
+        return myitems_pb2.Item(id=self._ids[slot], name=self.name(slot))
+
+
+    def stored_at(self, slot):
+        return self._stored_at[slot]
+
+
+    def expires_at(self, slot):
+        return self._expires_at[slot]
+
+
+    def encoded_size(self, slot):
+
+        # serialized size of the entry's Item message (id: int32 field 1, name: string field 2)
+        item_id, length = self._ids[slot], self._lengths[slot]
+        size = 0
+        if item_id:
+            size += 1 + (10 if item_id < 0 else varint_size(item_id))
+        if length:
+            size += 1 + varint_size(length) + length
+        return size
+
+
+    def put(self, item_id, name, now, expires_at=math.inf):
+
+        # inserts or replaces the entry and makes it the most recently used, returns its slot
+        slot = self._slots.get(item_id)
+
+        if slot is None:
+            slot = self._allocate()
+            self._slots[item_id] = slot
+            self._ids[slot] = item_id
+        else:
+            self._garbage += self._sizes[slot]
+            self._unlink(slot)
+
+        record = myitems_pb2.GetItemResponse(result=True, requested_item=myitems_pb2.Item(id=item_id, name=name)).SerializeToString()
+        self._offsets[slot] = len(self._arena)
+        self._sizes[slot] = len(record)
+        self._lengths[slot] = len(name.encode())
+        self._arena += record
+        self._stored_at[slot] = now
+        self._expires_at[slot] = expires_at
+        self._link(slot)
+        return slot
+
+
+    def touch(self, slot):
+        self._unlink(slot)
+        self._link(slot)
+
+
+    def remove(self, item_id):
+
+        # name of the removed entry, None when there was none
+        slot = self._slots.pop(item_id, None)
+        if slot is None:
+            return None
+
+        name = self.name(slot)
+        self._unlink(slot)
+        self._garbage += self._sizes[slot]
+
+        self._next[slot] = self._free
+        self._free = slot
+
+        if self._garbage > self.COMPACT_MIN_GARBAGE and self._garbage > len(self._arena) - self._garbage:
+            self._compact()
+
+        return name
+
+
+    def oldest(self):
+        # id of the least recently used entry, None when empty
+        slot = self._next[0]
+        return self._ids[slot] if slot else None
+
+
+    def slots(self):
+
+        # slots from least to most recently used
+        slot = self._next[0]
+        while slot:
+            yield slot
+            slot = self._next[slot]
+
+
+    def records(self):
+
+        # encoded records from least to most recently used, read from copies of the arena and columns
+        # (one memcpy each) so the caller can iterate after releasing the cache lock
+        arena, offsets, sizes, links = bytes(self._arena), self._offsets[:], self._sizes[:], self._next[:]
+
+        def walk():
+            slot = links[0]
+            while slot:
+                offset = offsets[slot]
+                yield arena[offset:offset + sizes[slot]]
+                slot = links[slot]
+
+        return walk()
+
+
+    def ids(self, newest_first=False):
+
+        links = self._prev if newest_first else self._next
+        result = []
+        slot = links[0]
+        while slot:
+            result.append(self._ids[slot])
+            slot = links[slot]
+        return result
+
+
+    def _allocate(self):
+
+        if self._free:
+            slot = self._free
+            self._free = self._next[slot]
+            return slot
+
+        for column in (self._ids, self._offsets, self._sizes, self._lengths, self._prev, self._next):
+            column.append(0)
+        self._stored_at.append(0.0)
+        self._expires_at.append(0.0)
+        return len(self._ids) - 1
+
+
+    def _link(self, slot):
+
+        # appended at the most recently used end, just before the sentinel
+        last = self._prev[0]
+        self._prev[slot] = last
+        self._next[slot] = 0
+        self._next[last] = slot
+        self._prev[0] = slot
+
+
+    def _unlink(self, slot):
+        before, after = self._prev[slot], self._next[slot]
+        self._next[before] = after
+        self._prev[after] = before
+
+
+    def _compact(self):
+
+        arena = bytearray()
+        for slot in self._slots.values():
+            offset = self._offsets[slot]
+            self._offsets[slot] = len(arena)
+            arena += self._arena[offset:offset + self._sizes[slot]]
+
+        self._arena = arena
+        self._garbage = 0
+
+
+
+
+# --- LRU Item Cache ---
+class LRUCache:
+
+    # Thread-safe LRU cache of items keyed by item id, held in a compact ItemStore (Item messages are built on read).
+    # Hits move the entry to the most-recent end, inserts evict from the least-recent end.
+    # Writers hold write_lock(key) across the MongoDB write and the cache update (put / pop),
+    # readers only fill() with an epoch taken before their MongoDB read, so a read that raced
+    # with a write can never put a stale item back into the cache. epoch counts writes, each write
+    # records it for the key's epoch stripe: a fill is only dropped when its own stripe was written
+    # since (or the cache was cleared), writes to other ids leave it alone.
+    # The asyncio server uses the async_write_lock(s) variants, a threading.Lock held across an
+    # await would block the event loop.
+    # ttl (seconds, optional): entries older than ttl read as misses, bounds staleness when writes
+    # can bypass this process and no change stream keeps the cache coherent. fill() can also give a
+    # single entry its own ttl (copies of shared tier items).
+    # The n-gram name index costs several times the store itself and only serves search() (fallback while
+    # MongoDB is down): it is built by the first search and dropped NAME_INDEX_IDLE seconds after the last one.
+    # The build runs outside the lock on a snapshot of ids and names, keys written meanwhile are collected
+    # in _index_changes and re-indexed before the index is swapped in. Searches during a build scan.
+
+    WRITE_LOCK_STRIPES = 64
+    EPOCH_STRIPES = 4096
+    NAME_INDEX_IDLE = 300
+    NAME_INDEX_CATCH_UP = 1024
+    NAME_INDEX_ROUNDS = 4
+
+    def __init__(self, max_size, ttl=None):
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._store = ItemStore()
+        self._name_index = None
+        self._searched_at = 0.0
+        self._index_changes = None
+        self._lock = threading.RLock()
+        self._write_locks = [threading.Lock() for _ in range(self.WRITE_LOCK_STRIPES)]
+        self._async_write_locks = [asyncio.Lock() for _ in range(self.WRITE_LOCK_STRIPES)]
+        self.epoch = 0
+        self._written_at = array("Q", bytes(8 * self.EPOCH_STRIPES))
+        self._cleared_at = 0
+
+        # counters exposed through the GetCacheStats RPC
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+
+    def __len__(self):
+        return len(self._store)
+
+
+    def __contains__(self, key):
+        return key in self._store
+
+
+    def get(self, key):
+
+        with self._lock:
+            slot = self._lookup(key)
+            return None if slot is None else self._store.item(slot)
+
+
+    def get_response(self, key):
+
+        # encoded GetItemResponse of the cached item, ready to be sent as is
+        with self._lock:
+            slot = self._lookup(key)
+            return None if slot is None else self._store.response(slot)
+
+
+    def _lookup(self, key):
+
+        slot = self._store.slot(key)
+
+        if slot is not None:
+            now = time.monotonic()
+            if self._store.expires_at(slot) < now or (self.ttl and now - self._store.stored_at(slot) > self.ttl):
+                self._remove(key)
+                slot = None
+
+        if slot is None:
+            self.misses += 1
+            return None
+
+        self._store.touch(slot)
+        self.hits += 1
+        return slot
+
+
+    def write_lock(self, key):
+        return self._write_locks[hash(key) % self.WRITE_LOCK_STRIPES]
+
+
+    @contextmanager
+    def write_locks(self, keys):
+
+        # Batch writers take every stripe they touch, always in stripe order to avoid deadlocks
+        stripes = sorted({hash(key) % self.WRITE_LOCK_STRIPES for key in keys})
+
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._write_locks[stripe])
+            yield
+
+
+    def async_write_lock(self, key):
+        return self._async_write_locks[hash(key) % self.WRITE_LOCK_STRIPES]
+
+
+    @asynccontextmanager
+    async def async_write_locks(self, keys):
+
+        stripes = sorted({hash(key) % self.WRITE_LOCK_STRIPES for key in keys})
+
+        async with AsyncExitStack() as stack:
+            for stripe in stripes:
+                await stack.enter_async_context(self._async_write_locks[stripe])
+            yield
+
+
+    def put(self, key, item):
+
+        # Write-through from a writer, invalidates in-flight fills of the key
+        with self._lock:
+            self._written(key)
+            self._insert(key, item)
+
+
+    def refresh(self, key, item):
+
+        # Change made outside this process: replaces the cached copy if there is one, invalidates in-flight fills of the key
+        with self._lock:
+            self._written(key)
+            if key in self._store:
+                self._insert(key, item)
+
+
+    def fill(self, key, item, epoch, ttl=None):
+
+        # Fill from a MongoDB (or shared tier) read, dropped when the key was written since epoch was taken
+        with self._lock:
+
+            if self._stale(key, epoch):
+                return False
+
+            self._insert(key, item, ttl)
+            return True
+
+
+    def _written(self, key):
+        self.epoch += 1
+        self._written_at[hash(key) % self.EPOCH_STRIPES] = self.epoch
+
+
+    def _stale(self, key, epoch):
+        return self._written_at[hash(key) % self.EPOCH_STRIPES] > epoch or self._cleared_at > epoch
+
+
+    def _insert(self, key, item, ttl=None):
+
+        if key in self._store:
+            self._remove(key)
+
+        # max_size 0 disables the cache
+        if self.max_size <= 0:
+            return
+
+        while len(self._store) >= self.max_size:
+            self._remove(self._store.oldest())
+            self.evictions += 1
+
+        now = time.monotonic()
+        slot = self._store.put(key, item.name, now, now + ttl if ttl else math.inf)
+        self.bytes += self._store.encoded_size(slot)
+
+        if self._index_changes is not None:
+            self._index_changes.add(key)
+
+        if self._name_index is None:
+            return
+
+        if now - self._searched_at > self.NAME_INDEX_IDLE:
+            self._name_index = None
+        else:
+            self._name_index.add(key, item.name)
+
+
+    def _build_name_index(self, names, changes):
+
+        # names: snapshot {key: name} taken under the lock, changes: keys written since (filled by _insert/_remove).
+        # Writes made during the build are caught up in rounds outside the lock, only the last one (small, or
+        # forced after NAME_INDEX_ROUNDS when writes keep up with the catch-up) holds it.
+        index = NGramIndex()
+        for key, name in names.items():
+            index.add(key, name)
+
+        for catch_up_round in range(self.NAME_INDEX_ROUNDS + 1):
+
+            with self._lock:
+
+                # cleared (or superseded) while building
+                if self._index_changes is not changes:
+                    return
+
+                current = {}
+                for key in changes:
+                    slot = self._store.slot(key)
+                    if slot is not None:
+                        current[key] = self._store.name(slot)
+
+                if len(changes) <= self.NAME_INDEX_CATCH_UP or catch_up_round == self.NAME_INDEX_ROUNDS:
+                    self._reindex(index, names, changes, current)
+                    self._name_index = index
+                    self._index_changes = None
+                    return
+
+                caught_up, changes = changes, set()
+                self._index_changes = changes
+
+            self._reindex(index, names, caught_up, current)
+
+
+    @staticmethod
+    def _reindex(index, names, keys, current):
+
+        # names tracks what the index holds for each key, current has the cached names of the keys
+        for key in keys:
+
+            name = names.pop(key, None)
+            if name is not None:
+                index.remove(key, name)
+
+            name = current.get(key)
+            if name is not None:
+                index.add(key, name)
+                names[key] = name
+
+
+    def _remove(self, key):
+
+        # name of the removed entry, None when the key was not cached
+        slot = self._store.slot(key)
+        if slot is None:
+            return None
+
+        self.bytes -= self._store.encoded_size(slot)
+        name = self._store.remove(key)
+        if self._index_changes is not None:
+            self._index_changes.add(key)
+        if self._name_index is not None:
+            self._name_index.remove(key, name)
+        return name
+
+
+    def pop(self, key):
+
+        with self._lock:
+
+            self._written(key)
+            name = self._remove(key)
+            return None if name is None else myitems_pb2.Item(id=key, name=name)
+
+
+    def validate(self, keys, current, epoch):
+
+        # Reconciles cached keys with the MongoDB state read after `epoch` was taken: current maps
+        # key -> Item for the keys that still exist. Returns the number of corrected entries, or None
+        # without touching anything when one of the keys was written since epoch (the caller reads again).
+        with self._lock:
+
+            if any(self._stale(key, epoch) for key in keys):
+                return None
+
+            corrected = 0
+
+            for key in keys:
+
+                slot = self._store.slot(key)
+                if slot is None:
+                    continue
+
+                item = current.get(key)
+
+                if item is None:
+                    self._remove(key)
+                    corrected += 1
+
+                elif item.name != self._store.name(slot):
+                    self._insert(key, item)
+                    corrected += 1
+
+            return corrected
+
+
+    def items(self):
+
+        # cached items from least to most recently used, decoded after the lock is released
+        with self._lock:
+            records = self._store.records()
+
+        return [myitems_pb2.GetItemResponse.FromString(record).requested_item for record in records]
+
+
+    def hot_keys(self):
+
+        # keys from most to least recently used
+        with self._lock:
+            return self._store.ids(newest_first=True)
+
+
+    def clear(self):
+
+        with self._lock:
+            self.epoch += 1
+            self._cleared_at = self.epoch
+            self._store.clear()
+            self._name_index = None
+            self._index_changes = None
+            self.bytes = 0
+
+
+    def search(self, substring, prefix=False):
+
+        # Case-insensitive substring (or prefix) search on item names, matches count as recently used.
+        # Only the n-gram index candidates are verified, queries shorter than N scan every item.
+        needle = substring.lower()
+        matcher = str.startswith if prefix else str.__contains__
+
+        with self._lock:
+
+            self._searched_at = time.monotonic()
+            build = self._name_index is None and self._index_changes is None
+            if build:
+                changes = self._index_changes = set()
+                names = {key: self._store.name(self._store.slot(key)) for key in self._store.ids()}
+
+        if build:
+            self._build_name_index(names, changes)
+
+        with self._lock:
+
+            # no index: another search is still building it
+            candidates = None if self._name_index is None else self._name_index.candidates(needle)
+            if candidates is None:
+                candidates = self._store.ids()
+
+            matches = []
+            for key in candidates:
+                slot = self._store.slot(key)
+                name = self._store.name(slot)
+                if matcher(name.lower(), needle):
+                    matches.append(myitems_pb2.Item(id=key, name=name))
+                    self._store.touch(slot)
+
+            if matches:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return matches
+
+
+    def stats(self):
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._store),
+                "max_size": self.max_size,
+                "bytes": self.bytes,
+            }
+
+
+
+
+# --- Name Search Query Cache ---
+class QueryCache:
+
+    # Complete results of name searches: (mode, normalized term) -> ids of every match, in MongoDB order.
+    # Items themselves stay in the LRUCache, ids missing there are fetched by id. Entries expire after
+    # `ttl` seconds and are invalidated by writes: the written id drops every entry holding it, a new name
+    # drops the searches it could now match. Fills carry an epoch like LRUCache.fill, so a search that
+    # raced with a write never stores an incomplete list: the last WRITE_LOG_SIZE writes are kept and a fill
+    # is only dropped when one made since its epoch touches it (same rule as the invalidation), or when
+    # the log no longer reaches back to its epoch. Results larger than max_results are not kept.
+
+    WRITE_LOG_SIZE = 1024
+
+    def __init__(self, ttl, max_size, max_results):
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_results = max_results
+        self._entries = OrderedDict()       # key -> (expires_at, ids)
+        self._by_id = defaultdict(set)      # item id -> keys of the entries holding it
+        self._lock = threading.Lock()
+        self.epoch = 0
+        self._writes = deque(maxlen=self.WRITE_LOG_SIZE)     # (epoch, item id, lowercased name)
+        self._cleared_at = 0
+
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def key(name, mode):
+
+        # mode: SearchMode name, word search ignores case and extra whitespace, the others only case
+        if mode == "TEXT":
+            return (mode, " ".join(name.lower().split()))
+
+        return (mode, name.lower())
+
+
+    def get(self, key):
+
+        with self._lock:
+
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+
+    @staticmethod
+    def matches_name(key, name):
+
+        # whether a search could match an item named `name` (lowercased)
+        mode, term = key
+        return mode == "TEXT" or (mode == "PREFIX" and name.startswith(term)) or (mode == "SUBSTRING" and term in name)
+
+
+    def _stale(self, key, ids, epoch):
+
+        if self._cleared_at > epoch:
+            return True
+
+        # writes since epoch, all of them have to still be in the log
+        recent = [write for write in self._writes if write[0] > epoch]
+        if len(recent) < self.epoch - epoch:
+            return True
+
+        ids = set(ids)
+        return any(item_id in ids or (name and self.matches_name(key, name)) for _, item_id, name in recent)
+
+
+    def put(self, key, ids, epoch):
+
+        with self._lock:
+
+            if self.ttl <= 0 or len(ids) > self.max_results or self._stale(key, ids, epoch):
+                return False
+
+            if key in self._entries:
+                self._forget(key)
+
+            while len(self._entries) >= self.max_size:
+                self._forget(next(iter(self._entries)))
+
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(ids))
+            for item_id in ids:
+                self._by_id[item_id].add(key)
+            return True
+
+
+    def _forget(self, key):
+
+        _, ids = self._entries.pop(key)
+
+        for item_id in ids:
+            keys = self._by_id.get(item_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_id[item_id]
+
+
+    def invalidate(self, item_id, name=""):
+
+        with self._lock:
+
+            name = name.lower()
+            self.epoch += 1
+            self._writes.append((self.epoch, item_id, name))
+            stale = set(self._by_id.get(item_id, ()))
+
+            if name:
+                stale.update(key for key in self._entries if self.matches_name(key, name))
+
+            for key in stale:
+                self._forget(key)
+
+
+    def clear(self):
+
+        # bulk writes (ImportItems) drop every entry instead of matching each name
+        with self._lock:
+            self.epoch += 1
+            self._cleared_at = self.epoch
+            self._entries.clear()
+            self._by_id.clear()
+
+
+    def stats(self):
+
+        with self._lock:
+            return {"query_hits": self.hits, "query_misses": self.misses, "query_size": len(self._entries)}
+
+
+
+
+# --- Negative Cache ---
+class NegativeCache:
+
+    # Ids recently found missing in MongoDB, so retried 404s and id range scans are answered without a query.
+    # Bounded LRU, entries expire after `ttl` seconds. Writers discard the ids they create after their write,
+    # adds carry an epoch taken before the MongoDB read like LRUCache.fill, so a lookup that raced with an
+    # insert never records the new id as missing. Writes are tracked per epoch stripe as in LRUCache: an add
+    # only skips the ids whose stripe was written since, writes to other ids leave it alone.
+
+    EPOCH_STRIPES = 4096
+
+    def __init__(self, ttl, max_size):
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expires_at = OrderedDict()    # id -> expiry time
+        self._lock = threading.Lock()
+        self.epoch = 0
+        self._written_at = array("Q", bytes(8 * self.EPOCH_STRIPES))
+        self._cleared_at = 0
+
+        self.hits = 0
+
+
+    def get(self, item_id):
+
+        # True when item_id is known to be missing
+        with self._lock:
+
+            expires_at = self._expires_at.get(item_id)
+            if expires_at is None:
+                return False
+
+            if expires_at < time.monotonic():
+                del self._expires_at[item_id]
+                return False
+
+            self.hits += 1
+            return True
+
+
+    def add(self, ids, epoch):
+
+        with self._lock:
+
+            if self.ttl <= 0 or self._cleared_at > epoch:
+                return
+
+            expires_at = time.monotonic() + self.ttl
+
+            for item_id in ids:
+                if self._written_at[hash(item_id) % self.EPOCH_STRIPES] > epoch:
+                    continue
+                self._expires_at.pop(item_id, None)
+                self._expires_at[item_id] = expires_at
+
+            while len(self._expires_at) > self.max_size:
+                self._expires_at.popitem(last=False)
+
+
+    def discard(self, ids):
+
+        with self._lock:
+            self.epoch += 1
+            for item_id in ids:
+                self._written_at[hash(item_id) % self.EPOCH_STRIPES] = self.epoch
+                self._expires_at.pop(item_id, None)
+
+
+    def clear(self):
+
+        with self._lock:
+            self.epoch += 1
+            self._cleared_at = self.epoch
+            self._expires_at.clear()
+
+
+    def stats(self):
+
+        with self._lock:
+            return {"negative_hits": self.hits, "negative_size": len(self._expires_at)}
+
+
+
+
+# --- Bloom Filter ---
+class BloomFilter:
+
+    # Bloom filter over every existing item id: a miss proves the id does not exist, a hit may be a false
+    # positive (about error_rate once `capacity` ids are in). Ids are never removed, deleted ids only cost
+    # a MongoDB lookup. Until load() finished every id may exist. Adds that happen during a (re)load go
+    # to the old and the new bit array, so an insert racing with the scan is never lost. Loads run one at a time.
+
+    def __init__(self, capacity, error_rate):
+
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.ready = False
+        self._bits = None
+        self._loading = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+        self.hits = 0
+
+
+    def _positions(self, key):
+
+        # double hashing on a splitmix64 mix of the id
+        h = (key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 31
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+    @staticmethod
+    def _set(bits, positions):
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+
+
+    def add_many(self, keys):
+
+        with self._lock:
+
+            for key in keys:
+
+                positions = self._positions(key)
+
+                if self._bits is not None:
+                    self._set(self._bits, positions)
+                if self._loading is not None:
+                    self._set(self._loading, positions)
+
+
+    def might_contain(self, key):
+
+        if not self.ready:
+            return True
+
+        bits = self._bits
+        if all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key)):
+            return True
+
+        self.hits += 1
+        return False
+
+
+    def load(self, keys):
+
+        # (Re)builds the filter from every existing id, returns their number. A failed load leaves it unused
+        with self._load_lock:
+
+            loading = bytearray((self.size + 7) // 8)
+            with self._lock:
+                self._loading = loading
+
+            count = 0
+
+            try:
+
+                for key in keys:
+
+                    positions = self._positions(key)
+                    with self._lock:
+                        self._set(loading, positions)
+                    count += 1
+
+            except BaseException:
+
+                with self._lock:
+                    self.ready = False
+                    self._loading = None
+                raise
+
+            with self._lock:
+                self._bits, self._loading = loading, None
+                self.ready = True
+
+            return count
+
+
+    def stats(self):
+        return {"bloom_hits": self.hits}
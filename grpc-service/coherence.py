@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import threading
+import time
+from pymongo import errors
+
+
+# Server error codes: change streams need a replica set, resume token older than the oplog
+NOT_A_REPLICA_SET = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+
+
+# --- Change Stream Watcher ---
+class ChangeStreamWatcher:
+
+    # Keeps the caches coherent with writes that bypass this process (other replicas, admin scripts, imports)
+    # by following the collection's change stream on a background thread:
+    # inserts / updates / replaces -> on_change(id, name), deletes -> on_change(id, None),
+    # events that cannot be mapped to an item (drop, rename, delete without pre-image) -> on_reset().
+    # The resume token is saved to token_path at most every SAVE_INTERVAL seconds, a restart
+    # continues after the last saved event, a token older than the oplog resets the caches instead.
+
+    SAVE_INTERVAL = 1.0
+
+    def __init__(self, collection, on_change, on_reset, token_path):
+
+        self.collection = collection
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.token_path = token_path
+        self.pre_images = False
+        self.events = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._saved_at = 0.0
+
+
+    def supported(self):
+
+        # change streams only exist on replica sets and sharded clusters
+        try:
+            with self.collection.watch(max_await_time_ms=1):
+                return True
+
+        except errors.OperationFailure as e:
+            if e.code == NOT_A_REPLICA_SET:
+                return False
+            raise
+
+
+    def enable_pre_images(self):
+
+        # delete events only carry _id, the pre-image (MongoDB 6.0+) tells which item id was deleted
+        try:
+            self.collection.database.command("collMod", self.collection.name, changeStreamPreAndPostImages={"enabled": True})
+            self.pre_images = True
+
+        except errors.OperationFailure as e:
+            logging.warning(f"Change stream pre-images unavailable, deletes will clear the cache: {e}")
+
+
+    def start(self):
+
+        self.enable_pre_images()
+        self._thread = threading.Thread(target=self._run, name="change-stream-watcher", daemon=True)
+        self._thread.start()
+        logging.info(f"Change stream watcher started (pre-images: {self.pre_images}).")
+
+
+    def stop(self):
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+    def _load_token(self):
+
+        try:
+            with open(self.token_path) as f:
+                return json.load(f)
+
+        except (OSError, ValueError):
+            return None
+
+
+    def _save_token(self, token, force=False):
+
+        if token is None or (not force and time.monotonic() - self._saved_at < self.SAVE_INTERVAL):
+            return
+
+        directory = os.path.dirname(self.token_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # written aside and renamed, a crash never leaves a truncated token behind
+        temp_path = f"{self.token_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(token, f)
+        os.replace(temp_path, self.token_path)
+        self._saved_at = time.monotonic()
+
+
+    def _run(self):
+
+        token = self._load_token()
+        options = {"full_document": "updateLookup", "max_await_time_ms": 1000}
+        if self.pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+
+        if token is not None:
+            logging.info("Change stream watcher resuming from the saved token.")
+
+        while not self._stop.is_set():
+
+            try:
+
+                with self.collection.watch(resume_after=token, **options) as stream:
+
+                    while not self._stop.is_set() and stream.alive:
+
+                        event = stream.try_next()
+
+                        if event is not None:
+                            self._apply(event)
+                            self.events += 1
+
+                        # a stream cannot resume after an invalidate event, the next one starts from now
+                        if event is not None and event["operationType"] == "invalidate":
+                            token = None
+                            break
+
+                        token = stream.resume_token
+                        self._save_token(token)
+
+
+            except errors.OperationFailure as e:
+
+                if token is not None and e.code == CHANGE_STREAM_HISTORY_LOST:
+                    logging.warning("Saved resume token is no longer in the oplog, clearing the cache.")
+                    token = None
+                    self.on_reset()
+                else:
+                    logging.error(f"Change stream error: {e}")
+                    self._stop.wait(1.0)
+
+
+            except errors.PyMongoError as e:
+
+                # resumes from the last token once MongoDB is back
+                logging.error(f"Change stream interrupted: {e}")
+                self._stop.wait(1.0)
+
+        self._save_token(token, force=True)
+
+
+    def _apply(self, event):
+
+        operation = event["operationType"]
+
+        if operation in ("insert", "update", "replace"):
+
+            # no full document: deleted before the lookup, its delete event follows
+            doc = event.get("fullDocument")
+            if doc is not None:
+                self.on_change(doc["id"], doc["name"])
+
+        elif operation == "delete":
+
+            before = event.get("fullDocumentBeforeChange")
+            if before is not None:
+                self.on_change(before["id"], None)
+            else:
+                self.on_reset()
+
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            logging.warning(f"Change stream event '{operation}', clearing the cache.")
+            self.on_reset()
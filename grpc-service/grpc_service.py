@@ -1,225 +1,1800 @@
 import grpc
+import asyncio
+import base64
 from concurrent import futures
+from itertools import islice
+import json
 import os
 import logging
+import queue
 import re
-from pymongo import MongoClient, errors
+import threading
+import time
+from pymongo import AsyncMongoClient, MongoClient, ReturnDocument, UpdateOne, TEXT, errors
 import myitems_pb2
 import myitems_pb2_grpc
-from collections import OrderedDict
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc
+from cache import BloomFilter, LRUCache, NegativeCache, QueryCache
+from shared_cache import SharedItemCache, open_backend
+from coherence import ChangeStreamWatcher
+from snapshot import read_snapshot, write_snapshot
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-# Cache to hold up to 1000 items
-CACHE_MAX_SIZE = 1000
-item_cache = OrderedDict()
+# Server mode: 'threaded' (grpc.server on a thread pool, blocking pymongo) or 'aio' (grpc.aio + async pymongo)
+GRPC_SERVER_MODE = os.environ.get("GRPC_SERVER_MODE", "threaded").lower()
+GRPC_MAX_WORKERS = int(os.environ.get("GRPC_MAX_WORKERS", 10))
+
+# Accept keepalive pings from the long-lived rest-service channels (default policy answers them with GOAWAY)
+GRPC_SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_recv_ping_interval_without_data_ms", 10000),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
+# aio mode: in-flight RPC limit (0 = unlimited) and MongoDB connection pool size
+GRPC_MAX_CONCURRENT_RPCS = int(os.environ.get("GRPC_MAX_CONCURRENT_RPCS", 0)) or None
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+
+# LRU Cache to hold up to CACHE_MAX_SIZE items (default 1000, 0 disables it)
+CACHE_MAX_SIZE = int(os.environ.get("CACHE_MAX_SIZE", 1000))
+item_cache = LRUCache(CACHE_MAX_SIZE)
+
+# Complete name search results (ids of every match) for QUERY_CACHE_TTL seconds, searches with
+# more than QUERY_CACHE_MAX_RESULTS matches are not kept
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", 30.0))
+QUERY_CACHE_MAX_SIZE = int(os.environ.get("QUERY_CACHE_MAX_SIZE", 1000))
+QUERY_CACHE_MAX_RESULTS = int(os.environ.get("QUERY_CACHE_MAX_RESULTS", 1000))
+query_cache = QueryCache(QUERY_CACHE_TTL, QUERY_CACHE_MAX_SIZE, QUERY_CACHE_MAX_RESULTS)
+
+# Ids found missing in MongoDB are answered as not found for NEGATIVE_CACHE_TTL seconds (0 disables it), up to
+# NEGATIVE_CACHE_MAX_SIZE ids. Name searches without a match are kept by the query cache
+NEGATIVE_CACHE_TTL = float(os.environ.get("NEGATIVE_CACHE_TTL", 10.0))
+NEGATIVE_CACHE_MAX_SIZE = int(os.environ.get("NEGATIVE_CACHE_MAX_SIZE", 100000))
+negative_cache = NegativeCache(NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_MAX_SIZE)
+
+# BLOOM_FILTER=1 loads a Bloom filter of every existing id at startup, ids it rules out are not looked up.
+# It has to see every insert: enable it for a single replica, or with CACHE_COHERENCE=changestream on a replica set.
+# SHARED_CACHE broadcasts are not enough, pub/sub drops messages and a missed insert would be answered as not found
+BLOOM_FILTER = os.environ.get("BLOOM_FILTER", "0") == "1"
+BLOOM_FILTER_CAPACITY = int(os.environ.get("BLOOM_FILTER_CAPACITY", 1000000))
+BLOOM_FILTER_ERROR_RATE = float(os.environ.get("BLOOM_FILTER_ERROR_RATE", 0.01))
+bloom_filter = BloomFilter(BLOOM_FILTER_CAPACITY, BLOOM_FILTER_ERROR_RATE)
+bloom_filter_reload = threading.Event()
+
+# Coherence with writes that bypass this process: 'off' (default), 'changestream' (MongoDB change stream,
+# needs a replica set, falls back to 'ttl' on a standalone server) or 'ttl' (cached items expire after CACHE_TTL seconds)
+CACHE_COHERENCE = os.environ.get("CACHE_COHERENCE", "off").lower()
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 60.0))
+CACHE_RESUME_TOKEN_PATH = os.environ.get("CACHE_RESUME_TOKEN_PATH", "data/resume_token.json")
+
+# Startup warm-up: 'recent' (newest items, default), 'hotkeys' (ids of the previous run's cache, saved to
+# CACHE_HOT_KEYS_PATH every CACHE_HOT_KEYS_INTERVAL seconds) or 'off'. Up to CACHE_WARMUP_SIZE items are loaded.
+# The health service reports NOT_SERVING until the warm-up is done, CACHE_WARMUP_BACKGROUND=1 serves while warming
+CACHE_WARMUP = os.environ.get("CACHE_WARMUP", "recent").lower()
+CACHE_WARMUP_SIZE = int(os.environ.get("CACHE_WARMUP_SIZE", CACHE_MAX_SIZE))
+CACHE_WARMUP_BATCH_SIZE = int(os.environ.get("CACHE_WARMUP_BATCH_SIZE", 1000))
+CACHE_WARMUP_BACKGROUND = os.environ.get("CACHE_WARMUP_BACKGROUND", "0") == "1"
+CACHE_HOT_KEYS_PATH = os.environ.get("CACHE_HOT_KEYS_PATH", "data/hot_keys.json")
+CACHE_HOT_KEYS_INTERVAL = float(os.environ.get("CACHE_HOT_KEYS_INTERVAL", 60.0))
+
+# Cache snapshots: the item cache is written to CACHE_SNAPSHOT_PATH every CACHE_SNAPSHOT_INTERVAL seconds ("" = off).
+# A restart loads a snapshot younger than CACHE_SNAPSHOT_MAX_AGE seconds instead of warming up, and checks
+# the restored items against MongoDB in the background
+CACHE_SNAPSHOT_PATH = os.environ.get("CACHE_SNAPSHOT_PATH", "")
+CACHE_SNAPSHOT_INTERVAL = float(os.environ.get("CACHE_SNAPSHOT_INTERVAL", 60.0))
+CACHE_SNAPSHOT_MAX_AGE = float(os.environ.get("CACHE_SNAPSHOT_MAX_AGE", 3600.0))
+
+# Shared L2 item cache for multi-replica deployments: "" (off), "local" (in-process stand-in) or a redis:// URL.
+# Entries live SHARED_CACHE_TTL seconds (so do their copies in the item cache), writes are broadcast so every replica
+# drops its own copies, and broadcast again SHARED_CACHE_REPEAT_DELAY seconds later (0 = once) to catch an old version
+# stored by a read that raced with the write
+SHARED_CACHE = os.environ.get("SHARED_CACHE", "")
+SHARED_CACHE_TTL = int(os.environ.get("SHARED_CACHE_TTL", 60))
+SHARED_CACHE_REPEAT_DELAY = float(os.environ.get("SHARED_CACHE_REPEAT_DELAY", 0.5))
+shared_cache = SharedItemCache(open_backend(SHARED_CACHE), SHARED_CACHE_TTL, SHARED_CACHE_REPEAT_DELAY)
+
+# Largest number of items accepted by one AddItems / GetItems / DeleteItems call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+
+# ImportItems buffers the stream into insert_many batches of IMPORT_BATCH_SIZE,
+# a partial batch is flushed once IMPORT_FLUSH_INTERVAL seconds passed since the last flush, also while the stream is quiet
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+IMPORT_FLUSH_INTERVAL = float(os.environ.get("IMPORT_FLUSH_INTERVAL", 1.0))
+
+# Largest page accepted by a paged GetItem name search
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 1000))
+
+
+# --- Shared Helpers ---
+def item_doc(item):
+    return {"id": item.id, "name": item.name, "name_lower": item.name.lower()}
+
+
+# Trailing metadata key of a write answered UNAVAILABLE before it reached MongoDB
+WRITE_NOT_APPLIED = "write-not-applied"
+
+
+def report_write_failure(context, method, e):
+
+    # No server could be selected: the write was never sent, safe to retry (UNAVAILABLE, flagged in the trailing
+    # metadata so the client can tell it from a call lost on the way). Any other connection failure
+    # (NetworkTimeout, AutoReconnect) may come after MongoDB applied the write: UNKNOWN, not blindly retried
+    logging.error(f"MongoDB connection error in {method}: {e}")
+
+    if isinstance(e, errors.ServerSelectionTimeoutError):
+        context.set_trailing_metadata(((WRITE_NOT_APPLIED, "1"),))
+        context.set_details("MongoDB is currently unavailable.")
+        context.set_code(grpc.StatusCode.UNAVAILABLE)
+    else:
+        context.set_details("MongoDB connection lost during the write, it may have been applied.")
+        context.set_code(grpc.StatusCode.UNKNOWN)
+
+
+def search_cache(request, shared=True):
+
+    # Cache lookup for GetItem by id: the item cache holds encoded GetItemResponses sent as is (see serialize_response),
+    # shared tier hits are wrapped in a message (shared=False leaves them to search_shared). Name searches are answered
+    # from the query cache, cached items alone cannot tell whether MongoDB holds more matches
+    if request.id <= 0:
+        return None
+
+    response = item_cache.get_response(request.id)
+
+    if response is None and shared:
+        return search_shared(request)
+
+    if response is not None:
+        logging.info(f"Cache hit for item id: {request.id}")
+
+    return response
+
+
+def search_shared(request):
+
+    shared_item = shared_lookup([request.id]).get(request.id)
+    if shared_item is None:
+        return None
+
+    logging.info(f"Shared cache hit for item id: {request.id}")
+    return myitems_pb2.GetItemResponse(result=True, requested_item=shared_item)
+
+
+async def off_loop(func, *args, **kwargs):
+    # shared tier calls block on Redis round trips, the asyncio server runs them in a worker thread
+    if not shared_cache.enabled:
+        return func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def serialize_response(response):
+    # GetItem responses: pre-encoded cache hits pass through, messages are serialized
+    return response if isinstance(response, bytes) else response.SerializeToString()
+
+
+def shared_lookup(ids):
+
+    # item cache misses looked up in the shared tier, hits are copied into the item cache for at most
+    # the shared TTL, so a stale shared copy does not outlive its shared entry for long
+    cache_epoch = item_cache.epoch
+    found = shared_cache.get_many(ids)
+
+    for item_id, item in found.items():
+        item_cache.fill(item_id, item, cache_epoch, ttl=shared_cache.ttl)
+
+    return found
+
+
+def fill_from_db(items, cache_epoch):
+
+    # items read by id go to the item cache and, unless a write raced with the read, to the shared tier
+    filled = [item for item in items if item_cache.fill(item.id, item, cache_epoch)]
+    shared_cache.put_many(filled)
+
+
+def invalidate_written(written):
+
+    # written: (id, name) of every written item, empty name for deletes. Drops the query cache entries,
+    # the shared copies, and has the other replicas drop theirs
+    for item_id, name in written:
+        query_cache.invalidate(item_id, name)
+
+    record_existing([item_id for item_id, name in written if name])
+    shared_cache.invalidate(written)
+
+
+def drop_invalidated(written, clear_queries):
+
+    # invalidation broadcast of another replica
+    for item_id, name in written:
+        item_cache.pop(item_id)
+        query_cache.invalidate(item_id, name)
+
+    record_existing([item_id for item_id, name in written if name])
+
+    # an import on another replica: its ids are not in the broadcast
+    if clear_queries:
+        query_cache.clear()
+        forget_missing()
+
+
+def known_missing(ids):
+
+    # ids that certainly do not exist: recently found missing, or ruled out by the Bloom filter
+    return {item_id for item_id in ids if negative_cache.get(item_id) or not bloom_filter.might_contain(item_id)}
+
+
+def record_existing(ids):
+
+    # ids just written (after the MongoDB write, so lookups that raced with it cannot record them as missing)
+    if ids:
+        negative_cache.discard(ids)
+        bloom_filter.add_many(ids)
+
+
+def forget_missing():
+
+    # inserts with unknown ids: nothing known about missing ids holds anymore
+    negative_cache.clear()
+    bloom_filter_reload.set()
+
+
+def bloom_filter_loader():
+
+    # one load at a time: reloads requested while one runs (an import broadcasts once per batch)
+    # are coalesced into a single load after it
+    while True:
+        bloom_filter_reload.wait()
+        bloom_filter_reload.clear()
+        load_bloom_filter()
+
+
+def load_bloom_filter():
+
+    started = time.monotonic()
+
+    try:
+        count = bloom_filter.load(doc["id"] for doc in items_collection.find({}, {"_id": 0, "id": 1}).batch_size(10000))
+
+    except errors.PyMongoError as e:
+        logging.error(f"Bloom filter load failed, every id lookup goes to MongoDB: {e}")
+        return
+
+    logging.info(f"Bloom filter loaded {count} id(s) in {time.monotonic() - started:.2f}s.")
+
+
+def query_cache_key(request):
+
+    # complete name searches are cached, id lookups and pages are not
+    if request.id > 0 or not request.name or is_paged(request):
+        return None
+
+    return QueryCache.key(request.name, myitems_pb2.SearchMode.Name(request.mode))
+
+
+def cached_items(ids):
+
+    # ids of a cached name search -> cached item or None, in result order
+    items = {item_id: item_cache.get(item_id) for item_id in ids}
+    items.update(shared_lookup([item_id for item_id, item in items.items() if item is None]))
+    return items
+
+
+def fallback_search(request):
+
+    # MongoDB down: n-gram index over the cached items, may miss matches that are not cached
+    if request.id > 0 or not request.name or request.mode == myitems_pb2.TEXT or is_paged(request):
+        return []
+
+    return item_cache.search(request.name, prefix=request.mode == myitems_pb2.PREFIX)
+
+
+def get_item_query(request):
+
+    if request.id > 0:
+        return {"id": request.id}
+
+    if request.name:
+        return name_query(request.name, request.mode)
+
+    return None
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+
+
+def apply_external_change(item_id, name):
+
+    # change stream event, name is None for a delete. Cached copies are replaced, not added,
+    # so changes to items nobody reads do not evict the working set
+    if name is None:
+        item_cache.pop(item_id)
+        query_cache.invalidate(item_id)
+    else:
+        item_cache.refresh(item_id, myitems_pb2.Item(id=item_id, name=name))
+        query_cache.invalidate(item_id, name)
+        record_existing([item_id])
+
+
+def reset_caches():
+    item_cache.clear()
+    query_cache.clear()
+    forget_missing()
+
+
+def start_cache_coherence():
+
+    if CACHE_COHERENCE == "changestream":
+
+        watcher = ChangeStreamWatcher(items_collection, apply_external_change, reset_caches, CACHE_RESUME_TOKEN_PATH)
+
+        if watcher.supported():
+            watcher.start()
+            return watcher
+
+        logging.warning(f"MongoDB is not a replica set, no change stream. Falling back to a {CACHE_TTL}s cache TTL.")
+
+    if CACHE_COHERENCE in ("changestream", "ttl"):
+        item_cache.ttl = CACHE_TTL
+        logging.info(f"Cached items expire after {CACHE_TTL}s.")
+
+    return None
+
+
+
+
+# --- Pagination ---
+def encode_page_token(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_page_token(token):
+
+    # empty token = first page (None, no lower bound), raises ValueError on a malformed token
+    if not token:
+        return None
+
+    return int(base64.urlsafe_b64decode(token.encode()).decode())
+
+
+def is_paged(request):
+    return request.limit > 0 and request.id <= 0
+
+
+def page_error(request):
+
+    if request.limit < 0 or request.limit > MAX_PAGE_SIZE:
+        return f"'limit' must be between 1 and {MAX_PAGE_SIZE}."
+
+    try:
+        decode_page_token(request.page_token)
+    except ValueError:
+        return "Invalid page token."
+
+    return None
+
+
+def paged_query(request, query):
+
+    # Keyset pagination on id: the token holds the last id of the previous page, so a deep page
+    # starts from that id on the unique id index instead of skipping every earlier match
+    last_id = decode_page_token(request.page_token)
+    if last_id is None:
+        return query
+
+    return dict(query, id={"$gt": last_id})
+
+
+def split_page(docs, limit):
+
+    # limit + 1 documents are read, the extra one only tells that another page exists
+    if len(docs) <= limit:
+        return docs, ""
+
+    return docs[:limit], encode_page_token(docs[limit - 1]["id"])
+
+
+
+
+# --- Name Search ---
+def name_query(name, mode):
+
+    # Queries run on the lowercased name_lower field so they can use its index:
+    # PREFIX is an anchored regex (index range scan), TEXT uses the text index on name,
+    # SUBSTRING keeps the old contains semantics but scans index keys instead of documents
+    if mode == myitems_pb2.PREFIX:
+        return {"name_lower": {"$regex": f"^{re.escape(name.lower())}"}}
+
+    if mode == myitems_pb2.TEXT:
+        return {"$text": {"$search": name}}
+
+    return {"name_lower": {"$regex": re.escape(name.lower())}}
+
+
+def migrate_name_lower(batch_size=1000):
+
+    # Backfill name_lower for documents written before the field existed
+    migrated = 0
+    batch = []
+
+    for doc in items_collection.find({"name_lower": {"$exists": False}}, {"name": 1}):
+
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"name_lower": doc["name"].lower()}}))
+
+        if len(batch) >= batch_size:
+            items_collection.bulk_write(batch, ordered=False)
+            migrated += len(batch)
+            batch = []
+
+    if batch:
+        items_collection.bulk_write(batch, ordered=False)
+        migrated += len(batch)
+
+    if migrated:
+        logging.info(f"Backfilled name_lower for {migrated} item(s).")
+
+
+
+
+# --- Bulk Import ---
+# end of the import stream, queued by read_import_stream
+END_OF_STREAM = object()
+
+
+def read_import_stream(request_iterator, items):
+
+    # Threaded ImportItems: the stream is read on its own thread so the handler can flush on a timer while it is quiet
+    try:
+        for item in request_iterator:
+            items.put(item)
+        items.put(END_OF_STREAM)
+
+    except Exception as e:
+        items.put(e)
+
+
+def flush_timeout(buffer, last_flush):
+    # time left until the buffered items are due, None (wait for the next item) when nothing is buffered
+    return max(last_flush + IMPORT_FLUSH_INTERVAL - time.monotonic(), 0) if buffer else None
+
+
+def import_batch(items, summary):
+
+    # Unordered insert, duplicates and other write errors only reject their own item
+    summary.batches += 1
+
+    try:
+        result = items_collection.insert_many([item_doc(item) for item in items], ordered=False)
+        summary.inserted += len(result.inserted_ids)
+
+    except errors.BulkWriteError as e:
+        record_import_errors(e.details, summary)
+
+    record_existing([item.id for item in items])
+    query_cache.clear()
+    shared_cache.invalidate(clear_queries=True)
+
+
+def record_import_errors(details, summary):
+
+    duplicates = sum(1 for error in details["writeErrors"] if error["code"] == 11000)
+    summary.inserted += details["nInserted"]
+    summary.duplicates += duplicates
+    summary.failed += len(details["writeErrors"]) - duplicates
+
+
+
+
+# --- Cache Warm-up ---
+def load_hot_keys():
+
+    try:
+        with open(CACHE_HOT_KEYS_PATH) as f:
+            return [int(item_id) for item_id in json.load(f)]
+
+    except (OSError, ValueError, TypeError):
+        return []
+
+
+def save_hot_keys():
+
+    # ids of the cache, most recently used first, written aside and renamed
+    directory = os.path.dirname(CACHE_HOT_KEYS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{CACHE_HOT_KEYS_PATH}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(item_cache.hot_keys(), f)
+    os.replace(temp_path, CACHE_HOT_KEYS_PATH)
+
+
+def hot_keys_saver():
+
+    while True:
+
+        time.sleep(CACHE_HOT_KEYS_INTERVAL)
+
+        try:
+            save_hot_keys()
+        except OSError as e:
+            logging.error(f"Could not save hot keys: {e}")
+
+
+def warm_up_queries(size):
+
+    # (query, order) in load order, coldest items first so the hottest end up most recently used.
+    # order maps id -> position for the hot-key batches ($in matches come back in index order, not list order),
+    # None for the range read that is sorted on _id
+    if CACHE_WARMUP == "hotkeys":
+
+        coldest_first = load_hot_keys()[:size][::-1]
+        if coldest_first:
+            batches = [coldest_first[i:i + CACHE_WARMUP_BATCH_SIZE] for i in range(0, len(coldest_first), CACHE_WARMUP_BATCH_SIZE)]
+            return [({"id": {"$in": batch}}, {item_id: position for position, item_id in enumerate(batch)}) for batch in batches]
+
+        logging.info("No hot-key list saved yet, warming up with the most recent items.")
+
+    # newest `size` documents: find the _id boundary on the _id index, then read them oldest first
+    boundary = list(items_collection.find({}, {"_id": 1}).sort("_id", -1).skip(size - 1).limit(1))
+    return [({"_id": {"$gte": boundary[0]["_id"]}} if boundary else {}, None)]
+
+
+def warm_up_cache():
+
+    size = min(CACHE_WARMUP_SIZE, item_cache.max_size)
+
+    # nothing to load, warm_up_queries would ask for a negative skip
+    if CACHE_WARMUP == "off" or size <= 0:
+        return
+
+    started = time.monotonic()
+    loaded = 0
+
+    try:
+
+        for query, order in warm_up_queries(size):
+
+            cursor = items_collection.find(query, {"_id": 0, "id": 1, "name": 1})
+            if order is None:
+                cursor = cursor.sort("_id", 1)
+            cursor = cursor.batch_size(CACHE_WARMUP_BATCH_SIZE)
+
+            # one round trip per batch, the epoch is taken before each so a write racing with it drops the batch
+            while True:
+
+                cache_epoch = item_cache.epoch
+                docs = list(islice(cursor, CACHE_WARMUP_BATCH_SIZE))
+
+                if not docs:
+                    break
+
+                # a hot-key batch is a single read, put it back in hot-key order
+                if order is not None:
+                    docs.sort(key=lambda doc: order[doc["id"]])
+
+                loaded += sum(item_cache.fill(doc["id"], myitems_pb2.Item(id=doc["id"], name=doc["name"]), cache_epoch) for doc in docs)
+
+
+    except errors.PyMongoError as e:
+        logging.error(f"Cache warm-up interrupted: {e}")
+
+    logging.info(f"Cache warm-up ({CACHE_WARMUP}) loaded {loaded} item(s) in {time.monotonic() - started:.2f}s.")
+
+
+
+
+# --- Cache Snapshots ---
+def snapshot_saver():
+
+    while True:
+
+        time.sleep(CACHE_SNAPSHOT_INTERVAL)
+
+        try:
+            count = write_snapshot(CACHE_SNAPSHOT_PATH, item_cache.items())
+            logging.info(f"Cache snapshot saved ({count} item(s)).")
+        except OSError as e:
+            logging.error(f"Could not save cache snapshot: {e}")
+
+
+def restore_snapshot():
+
+    # ids of the restored items, empty when there was no usable snapshot
+    if not CACHE_SNAPSHOT_PATH:
+        return []
+
+    started = time.monotonic()
+    cache_epoch = item_cache.epoch
+    restored = [item.id for item in read_snapshot(CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_MAX_AGE) if item_cache.fill(item.id, item, cache_epoch)]
+
+    if restored:
+        logging.info(f"Cache snapshot restored {len(restored)} item(s) in {time.monotonic() - started:.3f}s.")
+
+    return restored
+
+
+def validate_snapshot(ids):
+
+    # Restored items may be stale: one $in read per batch, deleted items are dropped and renamed ones replaced.
+    # A write racing with a batch makes its result unusable, the batch is read again
+    started = time.monotonic()
+    corrected = 0
+
+    try:
+
+        for i in range(0, len(ids), CACHE_WARMUP_BATCH_SIZE):
+
+            batch = ids[i:i + CACHE_WARMUP_BATCH_SIZE]
+
+            for _ in range(3):
+
+                cache_epoch = item_cache.epoch
+                docs = items_collection.find({"id": {"$in": batch}}, {"_id": 0, "id": 1, "name": 1})
+                result = item_cache.validate(batch, {doc["id"]: myitems_pb2.Item(id=doc["id"], name=doc["name"]) for doc in docs}, cache_epoch)
+
+                if result is not None:
+                    corrected += result
+                    break
+
+            else:
+                # busy writers: unchecked items are dropped, they are read again on their next miss
+                for item_id in batch:
+                    item_cache.pop(item_id)
+
+
+    except errors.PyMongoError as e:
+
+        # unchecked items cannot be trusted
+        logging.error(f"Cache snapshot validation interrupted, clearing the cache: {e}")
+        item_cache.clear()
+        return
+
+    logging.info(f"Cache snapshot validated in {time.monotonic() - started:.2f}s, {corrected} stale item(s) corrected.")
+
+
+def prepare_cache():
+
+    # A snapshot makes the cache warm immediately and is validated behind live traffic, otherwise warm up from MongoDB
+    restored = restore_snapshot()
+
+    if restored:
+        threading.Thread(target=validate_snapshot, args=(restored,), name="cache-snapshot-validation", daemon=True).start()
+    else:
+        warm_up_cache()
+
+
 
 
 # --- MongoDB Connection ---
 try:
 
-    # one connection for all methods
-    mongo_host = os.environ.get("MONGO_HOST", "localhost")
-    mongo_port = int(os.environ.get("MONGO_PORT", 27017))
-    mongo_db_name = os.environ.get("MONGO_DB", "itemsdb")
-    
-    client = MongoClient(mongo_host, mongo_port, serverSelectionTimeoutMS=5000)
-    db = client[mongo_db_name]
-    items_collection = db["items"]
-    
-    items_collection.create_index("id", unique=True)
-    items_collection.create_index("name", unique=True) # name is also indexed for faster search and duplicate check
-    logging.info("MongoDB connection initialized.")
+    # one connection for all methods
+    mongo_host = os.environ.get("MONGO_HOST", "localhost")
+    mongo_port = int(os.environ.get("MONGO_PORT", 27017))
+    mongo_db_name = os.environ.get("MONGO_DB", "itemsdb")
+    
+    client = MongoClient(mongo_host, mongo_port, serverSelectionTimeoutMS=5000)
+    db = client[mongo_db_name]
+    items_collection = db["items"]
+    
+    items_collection.create_index("id", unique=True)
+    items_collection.create_index("name", unique=True) # name is also indexed for faster search and duplicate check
+    items_collection.create_index("name_lower") # case-insensitive substring / prefix search
+    items_collection.create_index([("name", TEXT)]) # word search
+    migrate_name_lower()
+    logging.info("MongoDB connection initialized.")
+
+
+except Exception as e:
+    
+    logging.error(f"Could not connect to MongoDB: {e}")
+    exit(1)
+
+
+
+
+# --- Request Handling ---
+# Request checks, cache bookkeeping and responses shared by both servicers: ItemServiceServicer and
+# AsyncItemServiceServicer only differ in how they call MongoDB (blocking or awaited) and the shared tier
+# (directly or off the event loop)
+def oversized_batch(request, context):
+
+    if len(request.items) <= MAX_BATCH_SIZE:
+        return False
+
+    context.set_details(f"A batch can hold at most {MAX_BATCH_SIZE} items.")
+    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+    return True
+
+
+def item_from_doc(doc):
+    return myitems_pb2.Item(id=doc["id"], name=doc["name"])
+
+
+def name_update(item):
+    return {"$set": {"name": item.name, "name_lower": item.name.lower()}}
+
+
+def item_added(request):
+    logging.info(f"Added item id={request.id}, name='{request.name}'.")
+    return myitems_pb2.AddItemResponse(result=True, added_item=request)
+
+
+def item_exists(request, context):
+
+    logging.info(f"Item with id {request.id} or name '{request.name}' already exists.")
+    context.set_details(f"Item with id {request.id} or name '{request.name}' already exists.")
+
+    # context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+    # still return OK, only with result = False
+    return myitems_pb2.AddItemResponse(result=False, added_item=request)
+
+
+def item_updated(request, old_doc, context):
+
+    if not old_doc:
+        logging.info(f"Item with id {request.id} not found.")
+        context.set_details(f"Item with id {request.id} not found.")
+        context.set_code(grpc.StatusCode.NOT_FOUND)
+        return myitems_pb2.UpdateItemResponse(result=False)
+
+    logging.info(f"Updated item id={request.id}.")
+    return myitems_pb2.UpdateItemResponse(result=True, old_item=item_from_doc(old_doc), new_item=request)
+
+
+def name_in_use(request, context):
+
+    logging.info(f"Item name '{request.name}' is already in use.")
+    context.set_details(f"Item name '{request.name}' is already in use.")
+    context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+    return myitems_pb2.UpdateItemResponse(result=False)
+
+
+def item_deleted(request, deleted_doc, context):
+
+    if not deleted_doc:
+        logging.info(f"Item with id {request.id} not found.")
+        context.set_details(f"Item with id {request.id} not found.")
+        context.set_code(grpc.StatusCode.NOT_FOUND)
+        return myitems_pb2.DeleteItemResponse(result=False)
+
+    logging.info(f"Deleted item id={deleted_doc['id']}.")
+    return myitems_pb2.DeleteItemResponse(result=True, deleted_item=item_from_doc(deleted_doc))
+
+
+def items_added(request, failed):
+
+    # failed: indexes of the items rejected by the unique indexes
+    logging.info(f"Added {len(request.items) - len(failed)} item(s), {len(failed)} rejected.")
+
+    return myitems_pb2.AddItemsResponse(results=[
+        myitems_pb2.AddItemResponse(result=index not in failed, added_item=item)
+        for index, item in enumerate(request.items)
+    ])
+
+
+def cached_batch(request):
+
+    # GetItems, cache first: item cache hits {id: item} and the ids it does not hold
+    found = {}
+    missing = []
+
+    for item in request.items:
+        cached_item = item_cache.get(item.id)
+        if cached_item is not None:
+            found[item.id] = cached_item
+        else:
+            missing.append(item.id)
+
+    return found, missing
+
+
+def still_missing(missing, shared):
+    # ids left for MongoDB: not in the shared tier and not known to be missing
+    absent = known_missing(missing)
+    return [item_id for item_id in missing if item_id not in shared and item_id not in absent]
+
+
+def items_found(request, found, missing):
+
+    logging.info(f"Found {len(found)} of {len(request.items)} item(s), {len(request.items) - len(missing)} without MongoDB.")
+
+    return myitems_pb2.GetItemsResponse(results=[
+        myitems_pb2.GetItemResponse(result=True, requested_item=found[item.id]) if item.id in found
+        else myitems_pb2.GetItemResponse(result=False, requested_item=myitems_pb2.Item(id=item.id))
+        for item in request.items
+    ])
+
+
+def items_deleted(ids, deleted):
+
+    logging.info(f"Deleted {len(deleted)} of {len(ids)} item(s).")
+
+    return myitems_pb2.DeleteItemsResponse(results=[
+        myitems_pb2.DeleteItemResponse(result=True, deleted_item=deleted[item_id]) if item_id in deleted
+        else myitems_pb2.DeleteItemResponse(result=False, deleted_item=myitems_pb2.Item(id=item_id))
+        for item_id in ids
+    ])
+
+
+def read_failure(context, method, e, details="MongoDB is unavailable and item not in cache."):
+    logging.error(f"MongoDB error in {method}: {e}")
+    context.set_details(details)
+    context.set_code(grpc.StatusCode.UNAVAILABLE)
+
+
+def get_item_error(context, code, details):
+    context.set_details(details)
+    context.set_code(code)
+    return myitems_pb2.GetItemResponse(result=False)
+
+
+def invalid_get_item(request, context):
+
+    # Validated before any cache lookup, a bad limit or token is rejected whether the answer is cached or not
+    error = page_error(request)
+    if error:
+        return get_item_error(context, grpc.StatusCode.INVALID_ARGUMENT, error)
+
+    if get_item_query(request) is None:
+        logging.warning("GetItem request received without a valid ID or name.")
+        return get_item_error(context, grpc.StatusCode.INVALID_ARGUMENT, "Provide a valid item ID (greater than 0) or a name to search.")
+
+    return None
+
+
+def missing_item(request, context):
+
+    # Id known to be missing -> not found without asking MongoDB
+    if request.id <= 0 or not known_missing([request.id]):
+        return None
+
+    logging.info(f"Item id {request.id} is known to be missing.")
+    return get_item_error(context, grpc.StatusCode.NOT_FOUND, "No items found in database.")
+
+
+def query_cache_lookup(request):
+
+    # Repeated name search -> (key, complete result ids), ids None on a miss and key None for searches it does not keep
+    query_key = query_cache_key(request)
+    result_ids = query_cache.get(query_key) if query_key else None
+
+    if result_ids is not None:
+        logging.info(f"Query cache hit for '{request.name}' ({len(result_ids)} item(s)).")
+
+    return query_key, result_ids
+
+
+def uncached_ids(items):
+    return [item_id for item_id, item in items.items() if item is None]
+
+
+def query_cache_responses(items, context):
+
+    # items of a cached name search in result order, None for ids that are gone from MongoDB as well
+    found = [item for item in items.values() if item is not None]
+
+    if not found:
+        return [get_item_error(context, grpc.StatusCode.NOT_FOUND, "No items found in database.")]
+
+    return [myitems_pb2.GetItemResponse(result=True, requested_item=item) for item in found]
+
+
+class ItemSearch:
+
+    # One GetItem read from MongoDB: the epochs are taken before the read, fills are dropped if a write lands
+    # in between. found() answers each document and fills the caches, finish() stores the complete result
+    # in the query cache, failed() answers a lost connection. Lookups by id collect their items in `shared`,
+    # the servicer puts them into the shared tier.
+
+    def __init__(self, request, query_key):
+
+        self.request = request
+        self.query_key = query_key
+        self.paged = is_paged(request)
+        self.query = get_item_query(request)
+        if self.paged:
+            self.query = paged_query(request, self.query)
+
+        self.cache_epoch = item_cache.epoch
+        self.query_epoch = query_cache.epoch
+        self.negative_epoch = negative_cache.epoch
+
+        self.found_ids = []
+        self.shared = []
+        self.streamed = False
+        self._last_doc = None
+        self._next_page_token = ""
+
+
+    def page(self, docs):
+
+        # a page is at most MAX_PAGE_SIZE documents, read at once (limit + 1) to know whether another one follows
+        docs, self._next_page_token = split_page(docs, self.request.limit)
+        if docs:
+            self._last_doc = docs[-1]
+        return docs
+
+
+    def found(self, doc):
+
+        self.streamed = True
+        item = item_from_doc(doc)
+
+        # Update cache with new data from DB, lookups by id also fill the shared tier
+        if item_cache.fill(item.id, item, self.cache_epoch) and self.request.id > 0:
+            self.shared.append(item)
+
+        # ids of a complete name search go to the query cache, collected up to one past its limit
+        if self.query_key and len(self.found_ids) <= query_cache.max_results:
+            self.found_ids.append(item.id)
+
+        # the token of the next page rides on the last item of this one
+        token = self._next_page_token if doc is self._last_doc else ""
+        return myitems_pb2.GetItemResponse(result=True, requested_item=item, next_page_token=token)
+
+
+    def finish(self, context):
+
+        # the whole result was read, empty results are cached too. Returns the NOT_FOUND response or None
+        if self.query_key:
+            query_cache.put(self.query_key, self.found_ids, self.query_epoch)
+
+        if self.streamed:
+            return None
+
+        if self.request.id > 0:
+            negative_cache.add([self.request.id], self.negative_epoch)
+        return get_item_error(context, grpc.StatusCode.NOT_FOUND, "No items found in database.")
+
+
+    def failed(self, context, e, fallback):
+
+        # fallback: degraded answer from the cached items (fallback_search), only asked for when nothing was streamed yet
+        logging.error(f"MongoDB error in GetItem: {e}")
+
+        if fallback:
+            logging.warning(f"MongoDB unavailable, answering '{self.request.name}' with {len(fallback)} cached match(es), result may be partial.")
+            return [myitems_pb2.GetItemResponse(result=True, requested_item=item) for item in fallback]
+
+        return [get_item_error(context, grpc.StatusCode.UNAVAILABLE, "MongoDB is unavailable and item not in cache.")]
+
+
+def log_import_progress(received, summary, started, last_flush):
+    logging.info(f"Import progress: {received} received, {summary.inserted} inserted, {summary.duplicates} duplicate, "
+                 f"{summary.failed} failed ({received / max(last_flush - started, 1e-6):.0f} items/s).")
+
+
+def import_unavailable(context, summary, buffer, e):
+
+    # Items of the unflushed buffer are counted as failed, the client can resume from the summary
+    logging.error(f"MongoDB connection error in ImportItems: {e}")
+    summary.failed += len(buffer)
+    context.set_details("MongoDB is currently unavailable.")
+    context.set_code(grpc.StatusCode.UNAVAILABLE)
+    return summary
+
+
+def import_finished(summary, started):
+
+    elapsed = time.monotonic() - started
+    logging.info(f"Import finished in {elapsed:.1f}s: {summary.inserted} inserted, {summary.duplicates} duplicate, "
+                 f"{summary.failed} failed in {summary.batches} batch(es).")
+    return summary
+
+
+def cache_stats():
+
+    stats = {**item_cache.stats(), **query_cache.stats(), **shared_cache.stats(), **negative_cache.stats(), **bloom_filter.stats()}
+    logging.info(f"Cache stats: {stats}")
+    return myitems_pb2.CacheStatsResponse(**stats)
+
+
+
+
+# --- gRPC Services ---
+class ItemServiceServicer(myitems_pb2_grpc.ItemServiceServicer):
+
+
+    def AddItem(self, request, context):   
+        
+        logging.info(f"Request to add item: id={request.id}, name='{request.name}'")
+
+        try:
+
+            # MongoDB write and cache write-through happen in one critical section per id.
+            # Insert directly, the unique indexes on id and name reject duplicates in the same round trip
+            with item_cache.write_lock(request.id):
+                items_collection.insert_one(item_doc(request))
+                item_cache.put(request.id, request)
+                invalidate_written([(request.id, request.name)])
+
+            return item_added(request)
+
+
+        except errors.DuplicateKeyError:
+            return item_exists(request, context)
+
+ 
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "AddItem", e)
+            return myitems_pb2.AddItemResponse(result=False)
+
+
+
+    def GetItem(self, request, context):
+
+        error_response = invalid_get_item(request, context)
+
+        if error_response is not None:
+            yield error_response
+            return
+
+        # --- Search in Cache first, then ids known to be missing ---
+        cached_response = search_cache(request)
+        if cached_response is None:
+            cached_response = missing_item(request, context)
+
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        # --- Repeated name search -> complete result from the query cache ---
+        query_key, result_ids = query_cache_lookup(request)
+
+        if result_ids is not None:
+            yield from self._query_cache_results(result_ids, context)
+            return
+
+        # --- Search in MongoDB when no result in Cache  ---
+        logging.info("No item in Cache, continue to MongoDB.")
+        search = ItemSearch(request, query_key)
+
+        try:
+
+            if search.paged:
+                docs = search.page(list(items_collection.find(search.query).sort("id", 1).limit(request.limit + 1)))
+            else:
+                docs = items_collection.find(search.query)
+
+            for doc in docs:
+                yield search.found(doc)
+
+            shared_cache.put_many(search.shared)
+            not_found = search.finish(context)
+
+            if not_found is not None:
+                yield not_found
+
+
+        except errors.ConnectionFailure as e:
+
+            # degraded answer from the cached items when nothing was streamed yet
+            fallback = [] if search.streamed else fallback_search(request)
+            yield from search.failed(context, e, fallback)
+
+
+
+    def _query_cache_results(self, result_ids, context):
+
+        # Items of a cached name search: from the item cache, the rest fetched by id in one round trip
+        items = cached_items(result_ids)
+        missing = uncached_ids(items)
+
+        if missing:
+
+            cache_epoch = item_cache.epoch
+
+            try:
+                fetched = [item_from_doc(doc) for doc in items_collection.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "name": 1})]
+                fill_from_db(fetched, cache_epoch)
+                items.update((item.id, item) for item in fetched)
+
+            except errors.ConnectionFailure as e:
+                read_failure(context, "GetItem", e)
+                yield myitems_pb2.GetItemResponse(result=False)
+                return
+
+        yield from query_cache_responses(items, context)
+
+
+
+    def UpdateItem(self, request, context):
+
+        logging.info(f"Request to update item id={request.id} to name='{request.name}'")
+
+        # MongoDB write and cache write-through happen in one critical section per id.
+        # One round trip: the document before the update comes back, name conflicts come from the unique index
+        try:
+
+            with item_cache.write_lock(request.id):
+
+                old_doc = items_collection.find_one_and_update(
+                    {"id": request.id},
+                    name_update(request),
+                    projection={"_id": 0, "id": 1, "name": 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+
+                if old_doc:
+                    item_cache.put(request.id, myitems_pb2.Item(id=request.id, name=request.name))
+                    invalidate_written([(request.id, request.name)])
+
+
+        except errors.DuplicateKeyError:
+            return name_in_use(request, context)
+
+
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "UpdateItem", e)
+            return myitems_pb2.UpdateItemResponse(result=False)
+
+
+        return item_updated(request, old_doc, context)
+
+
+
+    def DeleteItem(self, request, context):
+
+        logging.info(f"Request to delete item id: {request.id}")
+
+        # MongoDB write and cache invalidation happen in one critical section per id
+        try:
+
+            with item_cache.write_lock(request.id):
+                deleted_doc = items_collection.find_one_and_delete({"id": request.id})
+                item_cache.pop(request.id)
+                invalidate_written([(request.id, "")])
+
+
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "DeleteItem", e)
+            return myitems_pb2.DeleteItemResponse(result=False)
+
+
+        return item_deleted(request, deleted_doc, context)
+
+
+
+    def AddItems(self, request, context):
+
+        logging.info(f"Request to add {len(request.items)} item(s).")
+
+        if oversized_batch(request, context) or not request.items:
+            return myitems_pb2.AddItemsResponse()
+
+        failed = set()
+
+        try:
+
+            # One unordered insert_many, duplicates are reported per item by the unique indexes
+            with item_cache.write_locks(item.id for item in request.items):
+
+                try:
+                    items_collection.insert_many([item_doc(item) for item in request.items], ordered=False)
+
+                except errors.BulkWriteError as e:
+                    failed = {error["index"] for error in e.details["writeErrors"]}
 
+                added = [item for index, item in enumerate(request.items) if index not in failed]
 
-except Exception as e:
-    
-    logging.error(f"Could not connect to MongoDB: {e}")
-    exit(1)
+                for item in added:
+                    item_cache.put(item.id, item)
 
+                invalidate_written([(item.id, item.name) for item in added])
 
 
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "AddItems", e)
+            return myitems_pb2.AddItemsResponse()
 
-# --- gRPC Services ---
-class ItemServiceServicer(myitems_pb2_grpc.ItemServiceServicer):
 
+        return items_added(request, failed)
+
+
+
+    def GetItems(self, request, context):
+
+        logging.info(f"Request to get {len(request.items)} item(s).")
+
+        if oversized_batch(request, context):
+            return myitems_pb2.GetItemsResponse()
+
+        # Cache first, the misses are looked up in the shared tier, then fetched from MongoDB in one $in query
+        found, missing = cached_batch(request)
+        shared = shared_lookup(missing)
+        found.update(shared)
+        missing = still_missing(missing, shared)
+
+        if missing:
+
+            cache_epoch = item_cache.epoch
+            negative_epoch = negative_cache.epoch
+
+            try:
+
+                fetched = [item_from_doc(doc) for doc in items_collection.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "name": 1})]
+                fill_from_db(fetched, cache_epoch)
+                found.update((item.id, item) for item in fetched)
+                negative_cache.add([item_id for item_id in missing if item_id not in found], negative_epoch)
+
+
+            except errors.ConnectionFailure as e:
+                read_failure(context, "GetItems", e, "MongoDB is unavailable and items not in cache.")
+                return myitems_pb2.GetItemsResponse()
+
+
+        return items_found(request, found, missing)
+
+
+
+    def DeleteItems(self, request, context):
+
+        logging.info(f"Request to delete {len(request.items)} item(s).")
+
+        if oversized_batch(request, context):
+            return myitems_pb2.DeleteItemsResponse()
+
+        ids = [item.id for item in request.items]
+        deleted = {}
+
+        try:
+
+            # The documents are read first so every deleted item can be returned, then removed with one delete_many
+            with item_cache.write_locks(ids):
+
+                for doc in items_collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "name": 1}):
+                    deleted[doc["id"]] = item_from_doc(doc)
+
+                if deleted:
+                    items_collection.delete_many({"id": {"$in": list(deleted)}})
+
+                for item_id in ids:
+                    item_cache.pop(item_id)
+
+                invalidate_written([(item_id, "") for item_id in ids])
+
+
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "DeleteItems", e)
+            return myitems_pb2.DeleteItemsResponse()
+
+
+        return items_deleted(ids, deleted)
+
+
+
+    def ImportItems(self, request_iterator, context):
+
+        # Bulk load: imported items are not put into the cache so a large import does not evict the working set
+        logging.info(f"Import started (batch size {IMPORT_BATCH_SIZE}, flush interval {IMPORT_FLUSH_INTERVAL}s).")
+
+        summary = myitems_pb2.ImportItemsSummary()
+        buffer = []
+        received = 0
+        started = last_flush = time.monotonic()
+
+        items = queue.Queue()
+        threading.Thread(target=read_import_stream, args=(request_iterator, items), name="import-stream-reader", daemon=True).start()
+
+        try:
+
+            while True:
+
+                # a timeout means the buffer is due for a flush
+                try:
+                    item = items.get(timeout=flush_timeout(buffer, last_flush))
+                except queue.Empty:
+                    item = None
+
+                if item is END_OF_STREAM:
+                    break
+
+                if isinstance(item, Exception):
+                    raise item
+
+                if item is not None:
+                    buffer.append(item)
+                    received += 1
+
+                if len(buffer) >= IMPORT_BATCH_SIZE or time.monotonic() - last_flush >= IMPORT_FLUSH_INTERVAL:
+
+                    import_batch(buffer, summary)
+                    buffer = []
+                    last_flush = time.monotonic()
+                    log_import_progress(received, summary, started, last_flush)
+
+            if buffer:
+                import_batch(buffer, summary)
+
+
+        except errors.ConnectionFailure as e:
+            return import_unavailable(context, summary, buffer, e)
+
+
+        return import_finished(summary, started)
+
+
+
+    def GetCacheStats(self, request, context):
+        return cache_stats()
+
+
+
+
+# --- gRPC Services (asyncio) ---
+class AsyncItemServiceServicer(myitems_pb2_grpc.ItemServiceServicer):
+
+    # Same contract as ItemServiceServicer on grpc.aio with the async PyMongo client,
+    # a slow MongoDB call only suspends its own request instead of holding one of the pool threads
+
+
+    def __init__(self, collection):
+        self.items = collection
+
+
+    async def AddItem(self, request, context):
 
-    def AddItem(self, request, context):   
-        
         logging.info(f"Request to add item: id={request.id}, name='{request.name}'")
 
         try:
 
-            if items_collection.find_one({"$or": [{"id": request.id}, {"name": request.name}]}):
-                logging.info(f"Item with id {request.id} or name '{request.name}' already exists.")
-                context.set_details(f"Item with id {request.id} or name '{request.name}' already exists.")
-                
-                # context.set_code(grpc.StatusCode.ALREADY_EXISTS)
-                # still return OK, only with result = False
-                return myitems_pb2.AddItemResponse(result=False, added_item=request)
-                
-            items_collection.insert_one({"id": request.id, "name": request.name})
-            logging.info(f"Added item id={request.id}, name='{request.name}'.")
-            
-            if len(item_cache) >= CACHE_MAX_SIZE:
-                item_cache.popitem(last=False)
-            
-            item_cache[request.id] = request
-            
-            return myitems_pb2.AddItemResponse(result=True, added_item=request)
+            async with item_cache.async_write_lock(request.id):
+                await self.items.insert_one(item_doc(request))
+                item_cache.put(request.id, request)
+                await off_loop(invalidate_written, [(request.id, request.name)])
+
+            return item_added(request)
+
+
+        except errors.DuplicateKeyError:
+            return item_exists(request, context)
+
 
- 
         except errors.ConnectionFailure as e:
-            
-            logging.error(f"MongoDB connection error in AddItem: {e}")
-            context.set_details("MongoDB is currently unavailable.")
-            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            report_write_failure(context, "AddItem", e)
             return myitems_pb2.AddItemResponse(result=False)
 
 
 
-    def GetItem(self, request, context):
-        
-        # --- Search in Cache first ---
-        cache_hits = []
-        
-        # Search by ID
-        if request.id > 0 and request.id in item_cache:
-            logging.info(f"Cache hit for item id: {request.id}")
-            cache_hits.append(item_cache[request.id])
-        
-        # Search cache by name
-        elif request.name:
-            logging.info(f"Searching cache for name like: '{request.name}'")
-            search_regex = re.compile(re.escape(request.name), re.IGNORECASE)
-            for item in item_cache.values():
-                if search_regex.search(item.name):
-                    cache_hits.append(item)
-        
-        # Found item in cache -> return from Cache
-        if cache_hits:
-            logging.info(f"Found {len(cache_hits)} item(s) in cache.")
-            for item in cache_hits:
-                yield myitems_pb2.GetItemResponse(result=True, requested_item=item)
+    async def GetItem(self, request, context):
+
+        error_response = invalid_get_item(request, context)
+
+        if error_response is not None:
+            yield error_response
             return
 
-        # --- Search in MongoDB when no result in Cache  ---
-        logging.info("No item in Cache, continue to MongoDB.")
+        cached_response = search_cache(request, shared=False)
+        if cached_response is None and request.id > 0:
+            cached_response = await off_loop(search_shared, request)
+        if cached_response is None:
+            cached_response = missing_item(request, context)
 
-        query = {}
+        if cached_response is not None:
+            yield cached_response
+            return
 
-        if request.id > 0:
-            query = {"id": request.id}
-        elif request.name:
-            query = {"name": re.compile(re.escape(request.name), re.IGNORECASE)}
-        else:
-            logging.warning("GetItem request received without a valid ID or name.")
-            context.set_details("Provide a valid item ID (greater than 0) or a name to search.")
-            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
-            yield myitems_pb2.GetItemResponse(result=False)
+        query_key, result_ids = query_cache_lookup(request)
+
+        if result_ids is not None:
+            async for response in self._query_cache_results(result_ids, context):
+                yield response
             return
 
-        try:
+        logging.info("No item in Cache, continue to MongoDB.")
+        search = ItemSearch(request, query_key)
 
-            found_items = items_collection.find(query)
-            db_has_results = False
+        try:
 
-            for doc in found_items:
-                
-                db_has_results = True
-                item_proto = myitems_pb2.Item(id=doc["id"], name=doc["name"])
+            if search.paged:
+                docs = async_iter(search.page(await self.items.find(search.query).sort("id", 1).limit(request.limit + 1).to_list(None)))
+            else:
+                docs = self.items.find(search.query)
 
-                # Update cache with new data from DB
-                if len(item_cache) >= CACHE_MAX_SIZE:
-                    item_cache.popitem(last=False)
-                item_cache[item_proto.id] = item_proto
+            async for doc in docs:
+                yield search.found(doc)
 
-                yield myitems_pb2.GetItemResponse(result=True, requested_item=item_proto)
+            await off_loop(shared_cache.put_many, search.shared)
+            not_found = search.finish(context)
 
-            if not db_has_results:
-                context.set_details("No items found in database.")
-                context.set_code(grpc.StatusCode.NOT_FOUND)
-                yield myitems_pb2.GetItemResponse(result=False)
+            if not_found is not None:
+                yield not_found
 
 
         except errors.ConnectionFailure as e:
-            
-            logging.error(f"MongoDB error in GetItem: {e}")
-            
-            context.set_details("MongoDB is unavailable and item not in cache.")
-            context.set_code(grpc.StatusCode.UNAVAILABLE)
-            yield myitems_pb2.GetItemResponse(result=False)
-            return
 
+            # the first search builds the name index, keep it off the event loop
+            fallback = [] if search.streamed else await asyncio.to_thread(fallback_search, request)
+            for response in search.failed(context, e, fallback):
+                yield response
 
 
-    def UpdateItem(self, request, context):
+
+    async def _query_cache_results(self, result_ids, context):
+
+        items = await off_loop(cached_items, result_ids)
+        missing = uncached_ids(items)
+
+        if missing:
+
+            cache_epoch = item_cache.epoch
+
+            try:
+                fetched = [item_from_doc(doc) async for doc in self.items.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "name": 1})]
+                await off_loop(fill_from_db, fetched, cache_epoch)
+                items.update((item.id, item) for item in fetched)
+
+            except errors.ConnectionFailure as e:
+                read_failure(context, "GetItem", e)
+                yield myitems_pb2.GetItemResponse(result=False)
+                return
+
+        for response in query_cache_responses(items, context):
+            yield response
+
+
+
+    async def UpdateItem(self, request, context):
 
         logging.info(f"Request to update item id={request.id} to name='{request.name}'")
-        old_doc = items_collection.find_one({"id": request.id})
-        
-        if not old_doc:
 
-            logging.info(f"Item with id {request.id} not found.")
-            context.set_details(f"Item with id {request.id} not found.")
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            return myitems_pb2.UpdateItemResponse(result=False)
+        try:
 
-        if old_doc["name"] != request.name and items_collection.find_one({"name": request.name}):
+            async with item_cache.async_write_lock(request.id):
 
-            logging.info(f"Item name '{request.name}' is already in use.")
-            context.set_details(f"Item name '{request.name}' is already in use.")
-            context.set_code(grpc.StatusCode.ALREADY_EXISTS)
-            return myitems_pb2.UpdateItemResponse(result=False)
+                old_doc = await self.items.find_one_and_update(
+                    {"id": request.id},
+                    name_update(request),
+                    projection={"_id": 0, "id": 1, "name": 1},
+                    return_document=ReturnDocument.BEFORE
+                )
 
-        items_collection.update_one({"id": request.id}, {"$set": {"name": request.name}})
+                if old_doc:
+                    item_cache.put(request.id, myitems_pb2.Item(id=request.id, name=request.name))
+                    await off_loop(invalidate_written, [(request.id, request.name)])
 
-        logging.info(f"Updated item id={request.id}.")
 
-        return myitems_pb2.UpdateItemResponse(
-            result=True,
-            old_item=myitems_pb2.Item(id=old_doc["id"], name=old_doc["name"]),
-            new_item=request
-        )
+        except errors.DuplicateKeyError:
+            return name_in_use(request, context)
 
 
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "UpdateItem", e)
+            return myitems_pb2.UpdateItemResponse(result=False)
 
-    def DeleteItem(self, request, context):
 
-        logging.info(f"Request to delete item id: {request.id}")
-        deleted_doc = items_collection.find_one_and_delete({"id": request.id})
+        return item_updated(request, old_doc, context)
 
-        if deleted_doc:
 
-            logging.info(f"Deleted item id={deleted_doc['id']}.")
-            deleted_item = myitems_pb2.Item(id=deleted_doc["id"], name=deleted_doc["name"])
-            return myitems_pb2.DeleteItemResponse(result=True, deleted_item=deleted_item)
 
+    async def DeleteItem(self, request, context):
 
-        else:
+        logging.info(f"Request to delete item id: {request.id}")
+
+        try:
 
-            logging.info(f"Item with id {request.id} not found.")
-            context.set_details(f"Item with id {request.id} not found.")
-            context.set_code(grpc.StatusCode.NOT_FOUND)
+            async with item_cache.async_write_lock(request.id):
+                deleted_doc = await self.items.find_one_and_delete({"id": request.id})
+                item_cache.pop(request.id)
+                await off_loop(invalidate_written, [(request.id, "")])
+
+
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "DeleteItem", e)
             return myitems_pb2.DeleteItemResponse(result=False)
 
 
+        return item_deleted(request, deleted_doc, context)
+
+
+
+    async def AddItems(self, request, context):
+
+        logging.info(f"Request to add {len(request.items)} item(s).")
+
+        if oversized_batch(request, context) or not request.items:
+            return myitems_pb2.AddItemsResponse()
+
+        failed = set()
+
+        try:
+
+            async with item_cache.async_write_locks(item.id for item in request.items):
+
+                try:
+                    await self.items.insert_many([item_doc(item) for item in request.items], ordered=False)
+
+                except errors.BulkWriteError as e:
+                    failed = {error["index"] for error in e.details["writeErrors"]}
+
+                added = [item for index, item in enumerate(request.items) if index not in failed]
+
+                for item in added:
+                    item_cache.put(item.id, item)
+
+                await off_loop(invalidate_written, [(item.id, item.name) for item in added])
+
+
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "AddItems", e)
+            return myitems_pb2.AddItemsResponse()
+
+
+        return items_added(request, failed)
+
+
+
+    async def GetItems(self, request, context):
+
+        logging.info(f"Request to get {len(request.items)} item(s).")
+
+        if oversized_batch(request, context):
+            return myitems_pb2.GetItemsResponse()
+
+        found, missing = cached_batch(request)
+        shared = await off_loop(shared_lookup, missing)
+        found.update(shared)
+        missing = still_missing(missing, shared)
+
+        if missing:
+
+            cache_epoch = item_cache.epoch
+            negative_epoch = negative_cache.epoch
+
+            try:
+
+                fetched = [item_from_doc(doc) async for doc in self.items.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "name": 1})]
+                await off_loop(fill_from_db, fetched, cache_epoch)
+                found.update((item.id, item) for item in fetched)
+                negative_cache.add([item_id for item_id in missing if item_id not in found], negative_epoch)
+
+
+            except errors.ConnectionFailure as e:
+                read_failure(context, "GetItems", e, "MongoDB is unavailable and items not in cache.")
+                return myitems_pb2.GetItemsResponse()
+
+
+        return items_found(request, found, missing)
+
+
+
+    async def DeleteItems(self, request, context):
+
+        logging.info(f"Request to delete {len(request.items)} item(s).")
+
+        if oversized_batch(request, context):
+            return myitems_pb2.DeleteItemsResponse()
+
+        ids = [item.id for item in request.items]
+        deleted = {}
+
+        try:
+
+            async with item_cache.async_write_locks(ids):
+
+                async for doc in self.items.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "name": 1}):
+                    deleted[doc["id"]] = item_from_doc(doc)
+
+                if deleted:
+                    await self.items.delete_many({"id": {"$in": list(deleted)}})
+
+                for item_id in ids:
+                    item_cache.pop(item_id)
+
+                await off_loop(invalidate_written, [(item_id, "") for item_id in ids])
+
+
+        except errors.ConnectionFailure as e:
+            report_write_failure(context, "DeleteItems", e)
+            return myitems_pb2.DeleteItemsResponse()
+
+
+        return items_deleted(ids, deleted)
+
+
+
+    async def ImportItems(self, request_iterator, context):
+
+        logging.info(f"Import started (batch size {IMPORT_BATCH_SIZE}, flush interval {IMPORT_FLUSH_INTERVAL}s).")
+
+        summary = myitems_pb2.ImportItemsSummary()
+        buffer = []
+        received = 0
+        started = last_flush = time.monotonic()
+
+        stream = request_iterator.__aiter__()
+        next_item = None
+
+        try:
+
+            while True:
+
+                # the pending read is kept across timeouts, cancelling it could lose an item
+                if next_item is None:
+                    next_item = asyncio.ensure_future(stream.__anext__())
+
+                done, _ = await asyncio.wait({next_item}, timeout=flush_timeout(buffer, last_flush))
+
+                if done:
+
+                    try:
+                        item = next_item.result()
+                    except StopAsyncIteration:
+                        break
+
+                    next_item = None
+                    buffer.append(item)
+                    received += 1
+
+                if len(buffer) >= IMPORT_BATCH_SIZE or time.monotonic() - last_flush >= IMPORT_FLUSH_INTERVAL:
+
+                    await self._import_batch(buffer, summary)
+                    buffer = []
+                    last_flush = time.monotonic()
+                    log_import_progress(received, summary, started, last_flush)
+
+            if buffer:
+                await self._import_batch(buffer, summary)
+
+
+        except errors.ConnectionFailure as e:
+            return import_unavailable(context, summary, buffer, e)
+
+        finally:
+            if next_item is not None:
+                next_item.cancel()
+
+
+        return import_finished(summary, started)
+
+
+    async def _import_batch(self, items, summary):
+
+        summary.batches += 1
+
+        try:
+            result = await self.items.insert_many([item_doc(item) for item in items], ordered=False)
+            summary.inserted += len(result.inserted_ids)
+
+        except errors.BulkWriteError as e:
+            record_import_errors(e.details, summary)
+
+        record_existing([item.id for item in items])
+        query_cache.clear()
+        await off_loop(shared_cache.invalidate, clear_queries=True)
+
+
+
+    async def GetCacheStats(self, request, context):
+        return cache_stats()
+
+
 
 
 # --- gRPC Server Run ---
+# service name reported by the health service
+SERVICE_NAME = myitems_pb2.DESCRIPTOR.services_by_name["ItemService"].full_name
+
+
+class HandlerCollector:
+
+    # stands in for the server in the generated add_ItemServiceServicer_to_server to collect its method handlers
+    def add_generic_rpc_handlers(self, generic_handlers):
+        pass
+
+
+    def add_registered_method_handlers(self, service_name, method_handlers):
+        self.method_handlers = method_handlers
+
+
+def add_item_service(servicer, server):
+
+    # generated handlers, except that GetItem sends pre-encoded cache hits without serializing them again
+    collector = HandlerCollector()
+    myitems_pb2_grpc.add_ItemServiceServicer_to_server(servicer, collector)
+
+    method_handlers = dict(collector.method_handlers)
+    method_handlers["GetItem"] = method_handlers["GetItem"]._replace(response_serializer=serialize_response)
+
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(SERVICE_NAME, method_handlers),))
+    server.add_registered_method_handlers(SERVICE_NAME, method_handlers)
+
+
 def serve():
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    myitems_pb2_grpc.add_ItemServiceServicer_to_server(ItemServiceServicer(), server)
+    # other replicas' writes drop their items from this process' caches
+    shared_cache.subscribe(drop_invalidated)
+    watcher = start_cache_coherence()
+
+    # the filter is used once loaded, until then every id lookup goes to MongoDB
+    if BLOOM_FILTER:
+        bloom_filter_reload.set()
+        threading.Thread(target=bloom_filter_loader, name="bloom-filter-load", daemon=True).start()
+
+        if shared_cache.enabled and watcher is None:
+            logging.warning("BLOOM_FILTER without a change stream only sees this replica's inserts, ids added by other replicas may be answered as not found.")
+
+    if CACHE_WARMUP == "hotkeys":
+        threading.Thread(target=hot_keys_saver, name="hot-keys-saver", daemon=True).start()
+
+    if CACHE_SNAPSHOT_PATH:
+        threading.Thread(target=snapshot_saver, name="cache-snapshot-saver", daemon=True).start()
+
+    # GRPC_SERVER_MODE=aio runs the asyncio server, anything else the thread pool server
+    if GRPC_SERVER_MODE == "aio":
+        asyncio.run(serve_aio())
+        return
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=GRPC_MAX_WORKERS), options=GRPC_SERVER_OPTIONS)
+    add_item_service(ItemServiceServicer(), server)
+
+    # standard grpc.health.v1 service, NOT_SERVING until the cache is warm (restored from a snapshot or warmed up)
+    health_servicer = health.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    set_health(health_servicer, health_pb2.HealthCheckResponse.NOT_SERVING)
+
     port = os.environ.get("GRPC_PORT", "50051")
     server.add_insecure_port(f"[::]:{port}")
     server.start()
-    logging.info(f"gRPC server listening on port {port}.")
+    logging.info(f"gRPC server listening on port {port} ({GRPC_MAX_WORKERS} worker threads).")
+
+    if CACHE_WARMUP_BACKGROUND:
+        threading.Thread(target=prepare_cache, name="cache-warm-up", daemon=True).start()
+    else:
+        prepare_cache()
+
+    set_health(health_servicer, health_pb2.HealthCheckResponse.SERVING)
     server.wait_for_termination()
 
 
+def set_health(health_servicer, status):
+    # overall server health ("") and the item service
+    for service in ("", SERVICE_NAME):
+        health_servicer.set(service, status)
+
+
+async def serve_aio():
+
+    # Setup (indexes, name_lower backfill) already ran on the blocking client at import,
+    # request handling uses its own async client with a connection pool sized for concurrent requests
+    async_client = AsyncMongoClient(mongo_host, mongo_port, serverSelectionTimeoutMS=5000, maxPoolSize=MONGO_MAX_POOL_SIZE)
+    collection = async_client[mongo_db_name]["items"]
+
+    server = grpc.aio.server(options=GRPC_SERVER_OPTIONS, maximum_concurrent_rpcs=GRPC_MAX_CONCURRENT_RPCS)
+    add_item_service(AsyncItemServiceServicer(collection), server)
+
+    health_servicer = health.aio.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    for service in ("", SERVICE_NAME):
+        await health_servicer.set(service, health_pb2.HealthCheckResponse.NOT_SERVING)
+
+    port = os.environ.get("GRPC_PORT", "50051")
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    logging.info(f"gRPC asyncio server listening on port {port}.")
+
+    # the warm-up reads through the blocking client, on a worker thread so the event loop keeps serving
+    warm_up = asyncio.create_task(asyncio.to_thread(prepare_cache))
+    if not CACHE_WARMUP_BACKGROUND:
+        await warm_up
+
+    for service in ("", SERVICE_NAME):
+        await health_servicer.set(service, health_pb2.HealthCheckResponse.SERVING)
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        await async_client.close()
+
+
 
 if __name__ == '__main__':
     serve()
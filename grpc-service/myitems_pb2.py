@@ -24,23 +24,41 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rmyitems.proto\x12\x07myitems\" \n\x04Item\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\"D\n\x0f\x41\x64\x64ItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12!\n\nadded_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\"H\n\x0fGetItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12%\n\x0erequested_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\"f\n\x12UpdateItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12\x1f\n\x08old_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\x12\x1f\n\x08new_item\x18\x03 \x01(\x0b\x32\r.myitems.Item\"I\n\x12\x44\x65leteItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12#\n\x0c\x64\x65leted_item\x18\x02 \x01(\x0b\x32\r.myitems.Item2\xeb\x01\n\x0bItemService\x12\x32\n\x07\x41\x64\x64Item\x12\r.myitems.Item\x1a\x18.myitems.AddItemResponse\x12\x34\n\x07GetItem\x12\r.myitems.Item\x1a\x18.myitems.GetItemResponse0\x01\x12\x38\n\nUpdateItem\x12\r.myitems.Item\x1a\x1b.myitems.UpdateItemResponse\x12\x38\n\nDeleteItem\x12\r.myitems.Item\x1a\x1b.myitems.DeleteItemResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rmyitems.proto\x12\x07myitems\" \n\x04Item\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\"p\n\x0eGetItemRequest\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12!\n\x04mode\x18\x03 \x01(\x0e\x32\x13.myitems.SearchMode\x12\r\n\x05limit\x18\x04 \x01(\x05\x12\x12\n\npage_token\x18\x05 \x01(\t\"D\n\x0f\x41\x64\x64ItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12!\n\nadded_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\"a\n\x0fGetItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12%\n\x0erequested_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\x12\x17\n\x0fnext_page_token\x18\x03 \x01(\t\"f\n\x12UpdateItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12\x1f\n\x08old_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\x12\x1f\n\x08new_item\x18\x03 \x01(\x0b\x32\r.myitems.Item\"I\n\x12\x44\x65leteItemResponse\x12\x0e\n\x06result\x18\x01 \x01(\x08\x12#\n\x0c\x64\x65leted_item\x18\x02 \x01(\x0b\x32\r.myitems.Item\")\n\tItemBatch\x12\x1c\n\x05items\x18\x01 \x03(\x0b\x32\r.myitems.Item\"=\n\x10\x41\x64\x64ItemsResponse\x12)\n\x07results\x18\x01 \x03(\x0b\x32\x18.myitems.AddItemResponse\"=\n\x10GetItemsResponse\x12)\n\x07results\x18\x01 \x03(\x0b\x32\x18.myitems.GetItemResponse\"C\n\x13\x44\x65leteItemsResponse\x12,\n\x07results\x18\x01 \x03(\x0b\x32\x1b.myitems.DeleteItemResponse\"[\n\x12ImportItemsSummary\x12\x10\n\x08inserted\x18\x01 \x01(\x03\x12\x12\n\nduplicates\x18\x02 \x01(\x03\x12\x0e\n\x06\x66\x61iled\x18\x03 \x01(\x03\x12\x0f\n\x07\x62\x61tches\x18\x04 \x01(\x03\"\x13\n\x11\x43\x61\x63heStatsRequest\"\xa0\x02\n\x12\x43\x61\x63heStatsResponse\x12\x0c\n\x04hits\x18\x01 \x01(\x03\x12\x0e\n\x06misses\x18\x02 \x01(\x03\x12\x11\n\tevictions\x18\x03 \x01(\x03\x12\x0c\n\x04size\x18\x04 \x01(\x03\x12\x10\n\x08max_size\x18\x05 \x01(\x03\x12\r\n\x05\x62ytes\x18\x06 \x01(\x03\x12\x12\n\nquery_hits\x18\x07 \x01(\x03\x12\x14\n\x0cquery_misses\x18\x08 \x01(\x03\x12\x12\n\nquery_size\x18\t \x01(\x03\x12\x13\n\x0bshared_hits\x18\n \x01(\x03\x12\x15\n\rshared_misses\x18\x0b \x01(\x03\x12\x15\n\rnegative_hits\x18\x0c \x01(\x03\x12\x15\n\rnegative_size\x18\r \x01(\x03\x12\x12\n\nbloom_hits\x18\x0e \x01(\x03*1\n\nSearchMode\x12\r\n\tSUBSTRING\x10\x00\x12\n\n\x06PREFIX\x10\x01\x12\x08\n\x04TEXT\x10\x02\x32\xb3\x04\n\x0bItemService\x12\x32\n\x07\x41\x64\x64Item\x12\r.myitems.Item\x1a\x18.myitems.AddItemResponse\x12>\n\x07GetItem\x12\x17.myitems.GetItemRequest\x1a\x18.myitems.GetItemResponse0\x01\x12\x38\n\nUpdateItem\x12\r.myitems.Item\x1a\x1b.myitems.UpdateItemResponse\x12\x38\n\nDeleteItem\x12\r.myitems.Item\x1a\x1b.myitems.DeleteItemResponse\x12\x39\n\x08\x41\x64\x64Items\x12\x12.myitems.ItemBatch\x1a\x19.myitems.AddItemsResponse\x12\x39\n\x08GetItems\x12\x12.myitems.ItemBatch\x1a\x19.myitems.GetItemsResponse\x12?\n\x0b\x44\x65leteItems\x12\x12.myitems.ItemBatch\x1a\x1c.myitems.DeleteItemsResponse\x12;\n\x0bImportItems\x12\r.myitems.Item\x1a\x1b.myitems.ImportItemsSummary(\x01\x12H\n\rGetCacheStats\x12\x1a.myitems.CacheStatsRequest\x1a\x1b.myitems.CacheStatsResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'myitems_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_SEARCHMODE']._serialized_start=1165
+  _globals['_SEARCHMODE']._serialized_end=1214
   _globals['_ITEM']._serialized_start=26
   _globals['_ITEM']._serialized_end=58
-  _globals['_ADDITEMRESPONSE']._serialized_start=60
-  _globals['_ADDITEMRESPONSE']._serialized_end=128
-  _globals['_GETITEMRESPONSE']._serialized_start=130
-  _globals['_GETITEMRESPONSE']._serialized_end=202
-  _globals['_UPDATEITEMRESPONSE']._serialized_start=204
-  _globals['_UPDATEITEMRESPONSE']._serialized_end=306
-  _globals['_DELETEITEMRESPONSE']._serialized_start=308
-  _globals['_DELETEITEMRESPONSE']._serialized_end=381
-  _globals['_ITEMSERVICE']._serialized_start=384
-  _globals['_ITEMSERVICE']._serialized_end=619
+  _globals['_GETITEMREQUEST']._serialized_start=60
+  _globals['_GETITEMREQUEST']._serialized_end=172
+  _globals['_ADDITEMRESPONSE']._serialized_start=174
+  _globals['_ADDITEMRESPONSE']._serialized_end=242
+  _globals['_GETITEMRESPONSE']._serialized_start=244
+  _globals['_GETITEMRESPONSE']._serialized_end=341
+  _globals['_UPDATEITEMRESPONSE']._serialized_start=343
+  _globals['_UPDATEITEMRESPONSE']._serialized_end=445
+  _globals['_DELETEITEMRESPONSE']._serialized_start=447
+  _globals['_DELETEITEMRESPONSE']._serialized_end=520
+  _globals['_ITEMBATCH']._serialized_start=522
+  _globals['_ITEMBATCH']._serialized_end=563
+  _globals['_ADDITEMSRESPONSE']._serialized_start=565
+  _globals['_ADDITEMSRESPONSE']._serialized_end=626
+  _globals['_GETITEMSRESPONSE']._serialized_start=628
+  _globals['_GETITEMSRESPONSE']._serialized_end=689
+  _globals['_DELETEITEMSRESPONSE']._serialized_start=691
+  _globals['_DELETEITEMSRESPONSE']._serialized_end=758
+  _globals['_IMPORTITEMSSUMMARY']._serialized_start=760
+  _globals['_IMPORTITEMSSUMMARY']._serialized_end=851
+  _globals['_CACHESTATSREQUEST']._serialized_start=853
+  _globals['_CACHESTATSREQUEST']._serialized_end=872
+  _globals['_CACHESTATSRESPONSE']._serialized_start=875
+  _globals['_CACHESTATSRESPONSE']._serialized_end=1163
+  _globals['_ITEMSERVICE']._serialized_start=1217
+  _globals['_ITEMSERVICE']._serialized_end=1780
 # @@protoc_insertion_point(module_scope)
@@ -41,7 +41,7 @@ class ItemServiceStub(object):
                 _registered_method=True)
         self.GetItem = channel.unary_stream(
                 '/myitems.ItemService/GetItem',
-                request_serializer=myitems__pb2.Item.SerializeToString,
+                request_serializer=myitems__pb2.GetItemRequest.SerializeToString,
                 response_deserializer=myitems__pb2.GetItemResponse.FromString,
                 _registered_method=True)
         self.UpdateItem = channel.unary_unary(
@@ -54,6 +54,31 @@ class ItemServiceStub(object):
                 request_serializer=myitems__pb2.Item.SerializeToString,
                 response_deserializer=myitems__pb2.DeleteItemResponse.FromString,
                 _registered_method=True)
+        self.AddItems = channel.unary_unary(
+                '/myitems.ItemService/AddItems',
+                request_serializer=myitems__pb2.ItemBatch.SerializeToString,
+                response_deserializer=myitems__pb2.AddItemsResponse.FromString,
+                _registered_method=True)
+        self.GetItems = channel.unary_unary(
+                '/myitems.ItemService/GetItems',
+                request_serializer=myitems__pb2.ItemBatch.SerializeToString,
+                response_deserializer=myitems__pb2.GetItemsResponse.FromString,
+                _registered_method=True)
+        self.DeleteItems = channel.unary_unary(
+                '/myitems.ItemService/DeleteItems',
+                request_serializer=myitems__pb2.ItemBatch.SerializeToString,
+                response_deserializer=myitems__pb2.DeleteItemsResponse.FromString,
+                _registered_method=True)
+        self.ImportItems = channel.stream_unary(
+                '/myitems.ItemService/ImportItems',
+                request_serializer=myitems__pb2.Item.SerializeToString,
+                response_deserializer=myitems__pb2.ImportItemsSummary.FromString,
+                _registered_method=True)
+        self.GetCacheStats = channel.unary_unary(
+                '/myitems.ItemService/GetCacheStats',
+                request_serializer=myitems__pb2.CacheStatsRequest.SerializeToString,
+                response_deserializer=myitems__pb2.CacheStatsResponse.FromString,
+                _registered_method=True)
 
 
 class ItemServiceServicer(object):
@@ -83,6 +108,36 @@ class ItemServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def AddItems(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetItems(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DeleteItems(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ImportItems(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetCacheStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ItemServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -93,7 +148,7 @@ def add_ItemServiceServicer_to_server(servicer, server):
             ),
             'GetItem': grpc.unary_stream_rpc_method_handler(
                     servicer.GetItem,
-                    request_deserializer=myitems__pb2.Item.FromString,
+                    request_deserializer=myitems__pb2.GetItemRequest.FromString,
                     response_serializer=myitems__pb2.GetItemResponse.SerializeToString,
             ),
             'UpdateItem': grpc.unary_unary_rpc_method_handler(
@@ -106,6 +161,31 @@ def add_ItemServiceServicer_to_server(servicer, server):
                     request_deserializer=myitems__pb2.Item.FromString,
                     response_serializer=myitems__pb2.DeleteItemResponse.SerializeToString,
             ),
+            'AddItems': grpc.unary_unary_rpc_method_handler(
+                    servicer.AddItems,
+                    request_deserializer=myitems__pb2.ItemBatch.FromString,
+                    response_serializer=myitems__pb2.AddItemsResponse.SerializeToString,
+            ),
+            'GetItems': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetItems,
+                    request_deserializer=myitems__pb2.ItemBatch.FromString,
+                    response_serializer=myitems__pb2.GetItemsResponse.SerializeToString,
+            ),
+            'DeleteItems': grpc.unary_unary_rpc_method_handler(
+                    servicer.DeleteItems,
+                    request_deserializer=myitems__pb2.ItemBatch.FromString,
+                    response_serializer=myitems__pb2.DeleteItemsResponse.SerializeToString,
+            ),
+            'ImportItems': grpc.stream_unary_rpc_method_handler(
+                    servicer.ImportItems,
+                    request_deserializer=myitems__pb2.Item.FromString,
+                    response_serializer=myitems__pb2.ImportItemsSummary.SerializeToString,
+            ),
+            'GetCacheStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetCacheStats,
+                    request_deserializer=myitems__pb2.CacheStatsRequest.FromString,
+                    response_serializer=myitems__pb2.CacheStatsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'myitems.ItemService', rpc_method_handlers)
@@ -159,7 +239,7 @@ class ItemService(object):
             request,
             target,
             '/myitems.ItemService/GetItem',
-            myitems__pb2.Item.SerializeToString,
+            myitems__pb2.GetItemRequest.SerializeToString,
             myitems__pb2.GetItemResponse.FromString,
             options,
             channel_credentials,
@@ -224,3 +304,138 @@ class ItemService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def AddItems(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/myitems.ItemService/AddItems',
+            myitems__pb2.ItemBatch.SerializeToString,
+            myitems__pb2.AddItemsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetItems(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/myitems.ItemService/GetItems',
+            myitems__pb2.ItemBatch.SerializeToString,
+            myitems__pb2.GetItemsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DeleteItems(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/myitems.ItemService/DeleteItems',
+            myitems__pb2.ItemBatch.SerializeToString,
+            myitems__pb2.DeleteItemsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ImportItems(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/myitems.ItemService/ImportItems',
+            myitems__pb2.Item.SerializeToString,
+            myitems__pb2.ImportItemsSummary.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetCacheStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/myitems.ItemService/GetCacheStats',
+            myitems__pb2.CacheStatsRequest.SerializeToString,
+            myitems__pb2.CacheStatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
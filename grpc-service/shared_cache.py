@@ -0,0 +1,288 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+import myitems_pb2
+
+
+
+
+# --- Shared Cache Backends ---
+class LocalSharedCache:
+
+    # In-process stand-in for Redis with the subset used by SharedItemCache: values with a TTL
+    # (SET EX / MGET / DEL) and one publish/subscribe channel. Several servicers handed the same
+    # instance behave like replicas sharing one Redis, which is how the tier is tested without a server.
+
+    def __init__(self):
+
+        self._values = {}       # key -> (expires_at, value)
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+
+    def get_many(self, keys):
+
+        now = time.monotonic()
+
+        with self._lock:
+            entries = [self._values.get(key) for key in keys]
+            return [entry[1] if entry is not None and entry[0] > now else None for entry in entries]
+
+
+    def set_many(self, values, ttl):
+
+        expires_at = time.monotonic() + ttl
+
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = (expires_at, value)
+
+
+    def delete_many(self, keys):
+
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+
+    def close(self):
+        self._subscribers.clear()
+
+
+
+
+class RedisSharedCache:
+
+    # Redis (or any server speaking its protocol) as the shared tier. The client is imported lazily,
+    # `redis` is only needed when SHARED_CACHE points at a redis:// URL. Subscriptions are served by the
+    # client's background thread, short socket timeouts keep a slow Redis from stalling requests.
+
+    CHANNEL = "items:invalidate"
+
+    def __init__(self, url, timeout=0.25):
+
+        import redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._pubsub = None
+        self._listener = None
+
+
+    def get_many(self, keys):
+        return self._redis.mget(keys)
+
+
+    def set_many(self, values, ttl):
+
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set(key, value, ex=ttl)
+        pipeline.execute()
+
+
+    def delete_many(self, keys):
+        if keys:
+            self._redis.delete(*keys)
+
+
+    def publish(self, message):
+        self._redis.publish(self.CHANNEL, message)
+
+
+    def subscribe(self, callback):
+
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.CHANNEL: lambda message: callback(message["data"])})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=self._listener_error)
+
+
+    @staticmethod
+    def _listener_error(error, pubsub, thread):
+        # keep listening, the client reconnects on the next read
+        logging.warning(f"Shared cache subscription error: {error}")
+        time.sleep(1.0)
+
+
+    def close(self):
+
+        if self._listener is not None:
+            self._listener.stop()
+            self._pubsub.close()
+
+        self._redis.close()
+
+
+def open_backend(spec):
+
+    # SHARED_CACHE: "" (no shared tier), "local" or a redis:// / rediss:// URL
+    if not spec:
+        return None
+
+    if spec == "local":
+        return LocalSharedCache()
+
+    return RedisSharedCache(spec)
+
+
+
+
+# --- Shared Item Cache (L2) ---
+class SharedItemCache:
+
+    # Second cache tier behind the per-process LRUCache, shared by every grpc-service replica.
+    # Items are stored serialized under "item:<id>" with a TTL. Writers delete the shared copy and
+    # broadcast the written (id, name) pairs, the other replicas drop them from their own L1 and query
+    # cache. The shared tier is an optimisation only: backend errors are logged and read as misses.
+    # A replica that read an item just before a write can still store the old version after the delete,
+    # so every write is invalidated a second time repeat_delay seconds later (one background thread sends
+    # the due ones together). Callers give L1 copies of shared items the same ttl: a lost broadcast
+    # (pub/sub delivers at most once) or a stale shared copy is served for at most twice the ttl.
+    # Without a backend every method is a no-op, so callers never check whether the tier is enabled.
+
+    def __init__(self, backend, ttl, repeat_delay=0.5):
+
+        self.backend = backend
+        self.ttl = ttl
+        self.repeat_delay = repeat_delay
+        self.origin = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self._repeats = deque()     # (due, written) in due order
+        self._repeats_ready = threading.Condition()
+        self._repeater = None
+
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+
+    @staticmethod
+    def key(item_id):
+        return f"item:{item_id}"
+
+
+    def get_many(self, ids):
+
+        # id -> Item for the ids held by the shared tier
+        if not self.enabled or not ids:
+            return {}
+
+        try:
+            values = self.backend.get_many([self.key(item_id) for item_id in ids])
+
+        except Exception as e:
+            logging.warning(f"Shared cache read failed: {e}")
+            return {}
+
+        found = {item_id: myitems_pb2.Item.FromString(value) for item_id, value in zip(ids, values) if value is not None}
+        self.hits += len(found)
+        self.misses += len(ids) - len(found)
+        return found
+
+
+    def put_many(self, items):
+
+        if not self.enabled or not items:
+            return
+
+        try:
+            self.backend.set_many({self.key(item.id): item.SerializeToString() for item in items}, self.ttl)
+
+        except Exception as e:
+            logging.warning(f"Shared cache write failed: {e}")
+
+
+    def invalidate(self, written=(), clear_queries=False):
+
+        # written: (id, name) of every written item, empty name for deletes
+        if not self.enabled:
+            return
+
+        self._send_invalidation(list(written), clear_queries)
+
+        if written and self.repeat_delay > 0:
+            self._repeat_later(list(written))
+
+
+    def _send_invalidation(self, written, clear_queries):
+
+        message = json.dumps({"origin": self.origin, "items": written, "clear_queries": clear_queries})
+
+        try:
+            self.backend.delete_many([self.key(item_id) for item_id, _ in written])
+            self.backend.publish(message)
+
+        except Exception as e:
+            logging.warning(f"Shared cache invalidation failed, other replicas may serve stale items for up to {2 * self.ttl}s: {e}")
+
+
+    def _repeat_later(self, written):
+
+        with self._repeats_ready:
+
+            self._repeats.append((time.monotonic() + self.repeat_delay, written))
+            self._repeats_ready.notify()
+
+            if self._repeater is None:
+                self._repeater = threading.Thread(target=self._send_repeats, name="shared-cache-repeat", daemon=True)
+                self._repeater.start()
+
+
+    def _send_repeats(self):
+
+        while True:
+
+            with self._repeats_ready:
+                while not self._repeats:
+                    self._repeats_ready.wait()
+                due = self._repeats[0][0]
+
+            time.sleep(max(due - time.monotonic(), 0))
+
+            # every invalidation due by now goes out as one delete + broadcast
+            written = []
+            with self._repeats_ready:
+                while self._repeats and self._repeats[0][0] <= time.monotonic():
+                    written.extend(self._repeats.popleft()[1])
+
+            self._send_invalidation(written, False)
+
+
+    def subscribe(self, on_invalidate):
+
+        # on_invalidate(written, clear_queries) runs for broadcasts of the other replicas
+        if not self.enabled:
+            return
+
+        def receive(message):
+            message = json.loads(message)
+            if message["origin"] != self.origin:
+                on_invalidate([tuple(pair) for pair in message["items"]], message["clear_queries"])
+
+        try:
+            self.backend.subscribe(receive)
+
+        except Exception as e:
+            logging.error(f"Shared cache subscription failed, invalidations of other replicas will not be received: {e}")
+
+
+    def close(self):
+        if self.enabled:
+            self.backend.close()
+
+
+    def stats(self):
+        return {"shared_hits": self.hits, "shared_misses": self.misses}
@@ -0,0 +1,88 @@
+import logging
+import os
+import struct
+import time
+from google.protobuf.message import DecodeError
+import myitems_pb2
+
+
+# File layout: MAGIC, header (version, created_at unix time, item count), then per item
+# a 4-byte big-endian length followed by the serialized Item, least recently used first
+MAGIC = b"ITEMSNAP"
+VERSION = 1
+HEADER = struct.Struct(">Bdi")
+LENGTH = struct.Struct(">I")
+
+
+
+
+# --- Cache Snapshots ---
+def write_snapshot(path, items):
+
+    # written aside and renamed, a crash during the write leaves the previous snapshot in place
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "wb") as f:
+
+        f.write(MAGIC)
+        f.write(HEADER.pack(VERSION, time.time(), len(items)))
+
+        for item in items:
+            data = item.SerializeToString()
+            f.write(LENGTH.pack(len(data)))
+            f.write(data)
+
+    os.replace(temp_path, path)
+    return len(items)
+
+
+def read_snapshot(path, max_age):
+
+    # Items of the snapshot in file order, empty when there is none, it is unreadable or older than max_age seconds
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+
+    except FileNotFoundError:
+        return []
+
+    if not data.startswith(MAGIC) or len(data) < len(MAGIC) + HEADER.size:
+        logging.warning(f"Ignoring cache snapshot {path}: not a snapshot file.")
+        return []
+
+    version, created_at, count = HEADER.unpack_from(data, len(MAGIC))
+    age = time.time() - created_at
+
+    if version != VERSION or age > max_age:
+        logging.info(f"Ignoring cache snapshot {path} (version {version}, {age:.0f}s old).")
+        return []
+
+    items = []
+    offset = len(MAGIC) + HEADER.size
+
+    for _ in range(count):
+
+        if offset + LENGTH.size > len(data):
+            break
+
+        (length,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+
+        if offset + length > len(data):
+            break
+
+        try:
+            items.append(myitems_pb2.Item.FromString(data[offset:offset + length]))
+        except DecodeError:
+            break
+
+        offset += length
+
+    if len(items) != count:
+        logging.warning(f"Cache snapshot {path} is truncated or corrupt, {len(items)} of {count} item(s) read.")
+
+    return items
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from concurrent import futures
+import grpc
+import httpx
+import myitems_pb2
+import myitems_pb2_grpc
+
+
+# Concurrency benchmark for the REST layer, runs in-process against a stub gRPC backend
+# (own thread pool, so a blocked event loop cannot stall it) whose AddItem takes --add-delay
+# seconds and whose GetItem answers immediately:
+#   python benchmark.py slow-add --add-delay 0.5 --slow 5 --gets 100
+# Reports GET /items/ latency alone and while slow POST /items requests are in flight.
+
+
+class StubBackend(myitems_pb2_grpc.ItemServiceServicer):
+
+    def __init__(self, add_delay):
+        self.add_delay = add_delay
+
+    def AddItem(self, request, context):
+        time.sleep(self.add_delay)
+        return myitems_pb2.AddItemResponse(result=True, added_item=request)
+
+    def GetItem(self, request, context):
+        yield myitems_pb2.GetItemResponse(result=True, requested_item=myitems_pb2.Item(id=request.id, name="Stub"))
+
+
+async def get_latencies(client, count):
+
+    # measured from when the batch is issued, time spent waiting for a blocked event loop counts
+    start = time.perf_counter()
+
+    async def one(item_id):
+        response = await client.get(f"/items/?item_id={item_id}")
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(item_id) for item_id in range(1, count + 1)))
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    print(f"{label:>28}: p50 {statistics.median(latencies) * 1e3:8.2f} ms   max {latencies[-1] * 1e3:8.2f} ms")
+
+
+async def bench_slow_add(add_delay, slow, gets):
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=slow + gets))
+    myitems_pb2_grpc.add_ItemServiceServicer_to_server(StubBackend(add_delay), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+
+    os.environ["GRPC_HOST"], os.environ["GRPC_PORT"] = "127.0.0.1", str(port)
+    import rest_service
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async with rest_service.app.router.lifespan_context(rest_service.app):
+
+        transport = httpx.ASGITransport(app=rest_service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://rest") as client:
+
+            report("GET alone", await get_latencies(client, gets))
+
+            adds = [asyncio.create_task(client.post("/items", json={"id": i, "name": f"Slow {i}"})) for i in range(1, slow + 1)]
+            report(f"GET during {slow} slow AddItem", await get_latencies(client, gets))
+            await asyncio.gather(*adds)
+
+    server.stop(None)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    slow_add = commands.add_parser("slow-add")
+    slow_add.add_argument("--add-delay", type=float, default=0.5)
+    slow_add.add_argument("--slow", type=int, default=5)
+    slow_add.add_argument("--gets", type=int, default=100)
+
+    args = parser.parse_args()
+
+    if args.command == "slow-add":
+        asyncio.run(bench_slow_add(args.add_delay, args.slow, args.gets))
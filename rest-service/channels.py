@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import logging
+import grpc
+import myitems_pb2_grpc
+
+
+READY = grpc.ChannelConnectivity.READY
+TRANSIENT_FAILURE = grpc.ChannelConnectivity.TRANSIENT_FAILURE
+SHUTDOWN = grpc.ChannelConnectivity.SHUTDOWN
+
+
+
+
+# --- gRPC Channel Manager ---
+class ChannelManager:
+
+    # Owns a small round-robin pool of long-lived grpc.aio channels, opened once at startup and closed at shutdown.
+    # Channels are never rebuilt: gRPC reconnects them internally with the capped back-off from the channel
+    # options, and a watcher task per channel follows its connectivity state and asks IDLE channels to
+    # reconnect, so sockets and threads stay flat however long the backend is down.
+    # is_connected() lets the circuit breakers skip half-open trials while no channel is READY.
+    # call_stub() also tells whether a failed call can have reached the backend, so writes are only retried
+    # when it cannot: its channel was not READY when the call started and did not become READY since.
+
+    def __init__(self, address, size, options):
+
+        self.address = address
+        self.size = size
+        self.options = options
+        self._channels = []
+        self._stubs = []
+        self._states = []
+        self._watchers = []
+        self._connects = []
+        self._next = None
+
+
+    def open(self):
+
+        self._channels = [grpc.aio.insecure_channel(self.address, options=self.options) for _ in range(self.size)]
+        self._stubs = [myitems_pb2_grpc.ItemServiceStub(channel) for channel in self._channels]
+        self._states = [grpc.ChannelConnectivity.IDLE] * self.size
+        self._connects = [0] * self.size
+        self._next = itertools.cycle(range(self.size))
+        self._watchers = [asyncio.create_task(self._watch(index)) for index in range(self.size)]
+        logging.info(f"Opened {self.size} gRPC channel(s) to {self.address}.")
+
+
+    async def close(self):
+
+        for watcher in self._watchers:
+            watcher.cancel()
+
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        await asyncio.gather(*(channel.close() for channel in self._channels))
+        self._channels, self._stubs, self._states, self._watchers = [], [], [], []
+        logging.info("Closed gRPC channels.")
+
+
+    async def _watch(self, index):
+
+        channel = self._channels[index]
+        state = channel.get_state(try_to_connect=True)
+
+        while state != SHUTDOWN:
+
+            self._states[index] = state
+            await channel.wait_for_state_change(state)
+            new_state = channel.get_state(try_to_connect=True)
+
+            if new_state == READY:
+                self._connects[index] += 1
+
+            if new_state == READY or state == READY:
+                logging.info(f"gRPC channel {index} to {self.address}: {state.name} -> {new_state.name}.")
+
+            state = new_state
+
+
+    def is_connected(self):
+        return READY in self._states
+
+
+    def state(self):
+
+        # best state over the pool, READY if any channel is usable
+        if self.is_connected():
+            return READY.name
+        if self._states and all(state == TRANSIENT_FAILURE for state in self._states):
+            return TRANSIENT_FAILURE.name
+        return self._states[0].name if self._states else SHUTDOWN.name
+
+
+    def _pick(self):
+
+        # round robin, preferring READY channels when only part of the pool is connected
+        for _ in range(self.size):
+            index = next(self._next)
+            if self._states[index] == READY:
+                return index
+
+        return next(self._next)
+
+
+    def stub(self):
+        return self._stubs[self._pick()]
+
+
+    def call_stub(self):
+
+        # stub for one call plus may_have_arrived(), to be asked once the call failed
+        index = self._pick()
+        was_ready = self._channels[index].get_state() == READY
+        connects = self._connects[index]
+
+        def may_have_arrived():
+            return was_ready or self._channels[index].get_state() == READY or self._connects[index] != connects
+
+        return self._stubs[index], may_have_arrived
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import random
+import time
+import grpc
+
+
+# gRPC status codes that say something about the health of the backend, everything else
+# (NOT_FOUND, ALREADY_EXISTS, INVALID_ARGUMENT, ...) is a normal answer and must not trip a breaker
+TRANSIENT_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+}
+
+
+def is_transient(error):
+    return isinstance(error, grpc.RpcError) and error.code() in TRANSIENT_CODES
+
+
+# Trailing metadata set by grpc-service on an UNAVAILABLE write that never reached MongoDB
+WRITE_NOT_APPLIED = "write-not-applied"
+
+
+def write_not_applied(error):
+
+    # The only failures after which a non-idempotent write is known not to have been applied: UNAVAILABLE for a call
+    # that never left this process (the caller sets error.undelivered, see ChannelManager.call_stub), or flagged by
+    # grpc-service because no MongoDB server could be selected. Any other failure may come after the write was applied
+    if not isinstance(error, grpc.RpcError) or error.code() != grpc.StatusCode.UNAVAILABLE:
+        return False
+
+    if getattr(error, "undelivered", False):
+        return True
+
+    return any(key == WRITE_NOT_APPLIED for key, _ in (error.trailing_metadata() or ()))
+
+
+
+
+class CircuitBreakerError(Exception):
+    pass
+
+
+
+
+# --- Async Circuit Breaker ---
+class AsyncCircuitBreaker:
+
+    # asyncio-native replacement for pybreaker (whose call() holds a threading lock around the wrapped call).
+    # CLOSED: calls pass, fail_max consecutive transient failures open the breaker.
+    # OPEN: calls fail fast with CircuitBreakerError until reset_timeout seconds passed.
+    # HALF_OPEN: one trial call passes, success closes the breaker, failure opens it again.
+    # is_available (optional): connectivity check, the breaker stays open without a trial while it is False.
+    # State only changes between awaits on the event loop, so no lock is needed.
+
+    def __init__(self, fail_max, reset_timeout, name="breaker", is_available=None):
+
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.is_available = is_available
+        self.fail_counter = 0
+        self._state = "CLOSED"
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+
+    @property
+    def current_state(self):
+
+        if self._state == "OPEN" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "HALF_OPEN"
+        return self._state
+
+
+    async def call(self, func, *args, **kwargs):
+
+        state = self.current_state
+
+        if state == "OPEN" or (state == "HALF_OPEN" and self._trial_in_flight):
+            raise CircuitBreakerError(f"Circuit breaker '{self.name}' is open.")
+
+        if state == "HALF_OPEN" and self.is_available is not None and not self.is_available():
+            raise CircuitBreakerError(f"Circuit breaker '{self.name}' is open, gRPC-service not connected.")
+
+        if state == "HALF_OPEN":
+            self._trial_in_flight = True
+
+        try:
+            result = await func(*args, **kwargs)
+
+        except Exception as e:
+            if is_transient(e):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+
+        else:
+            self._on_success()
+            return result
+
+        finally:
+            if state == "HALF_OPEN":
+                self._trial_in_flight = False
+
+
+    def _on_success(self):
+
+        if self._state != "CLOSED":
+            logging.info(f"Circuit breaker '{self.name}' closed.")
+
+        self._state = "CLOSED"
+        self.fail_counter = 0
+
+
+    def _on_failure(self):
+
+        self.fail_counter += 1
+
+        if self._state == "OPEN" or self.fail_counter >= self.fail_max:
+
+            if self._state == "CLOSED":
+                logging.warning(f"Circuit breaker '{self.name}' opened after {self.fail_counter} failure(s).")
+
+            self._state = "OPEN"
+            self._opened_at = time.monotonic()
+
+
+
+
+# --- Retry Budget ---
+class RetryBudget:
+
+    # Token bucket limiting retries to a fraction of the traffic: every first attempt deposits
+    # `ratio` tokens, every retry withdraws one. A floor of min_per_second keeps low-traffic
+    # endpoints retrying, max_tokens caps the burst after a quiet period. During an outage
+    # retries stop once the budget is spent instead of multiplying the load on the backend.
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=10.0):
+
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._refilled_at = time.monotonic()
+
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+
+    def withdraw(self):
+
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._refilled_at) * self.min_per_second)
+        self._refilled_at = now
+
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+
+
+
+# --- Resilience Policy ---
+class ResiliencePolicy:
+
+    # Circuit breaker + retries with jittered exponential back-off + retry budget for one gRPC method.
+    # Idempotent calls are retried on every transient code, non-idempotent writes only when write_not_applied.
+
+    def __init__(self, name, idempotent, max_retries=2, base_delay=1.0, max_delay=4.0, fail_max=3, reset_timeout=6, is_available=None):
+
+        self.name = name
+        self.idempotent = idempotent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = AsyncCircuitBreaker(fail_max=fail_max, reset_timeout=reset_timeout, name=name, is_available=is_available)
+        self.budget = RetryBudget()
+
+
+    def _retryable(self, error):
+
+        if not is_transient(error):
+            return False
+
+        return self.idempotent or write_not_applied(error)
+
+
+    def backoff(self, attempt):
+        # "full jitter": uniform in [0, base * 2^attempt], spreads retries of concurrent callers
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+    async def call(self, attempt_call):
+
+        # attempt_call: zero-argument coroutine function, called once per attempt
+        self.budget.deposit()
+
+        for attempt in range(self.max_retries + 1):
+
+            try:
+                return await self.breaker.call(attempt_call)
+
+            except grpc.RpcError as e:
+
+                if attempt == self.max_retries or not self._retryable(e):
+                    raise
+
+                if not self.budget.withdraw():
+                    logging.warning(f"{self.name}: retry budget exhausted, not retrying.")
+                    raise
+
+                delay = self.backoff(attempt)
+                logging.warning(f"{self.name}: call {attempt + 1} failed ({e.code().name}), retrying in {delay:.2f}s.")
+                await asyncio.sleep(delay)
@@ -0,0 +1,141 @@
+import hashlib
+import time
+from collections import OrderedDict, defaultdict, deque
+
+
+
+
+# --- REST Response Cache ---
+class ResponseCache:
+
+    # Short-TTL cache of serialized GET /items/ bodies, keyed by (item_id, lowercased name, mode, limit, cursor).
+    # Each entry keeps its strong ETag (hash of the body) so repeated lookups and If-None-Match
+    # revalidations are answered without a gRPC call. Writes invalidate every entry holding the
+    # written id, plus name searches the new name could now match. Only touched from the event loop,
+    # so no lock is needed. A lookup carries the `epoch` taken before its gRPC call: the last WRITE_LOG_SIZE
+    # writes are kept and its result is only skipped when one made since touches it (same rule as the
+    # invalidation), or when the log no longer reaches back to its epoch.
+
+    WRITE_LOG_SIZE = 1024
+
+    def __init__(self, ttl, max_size):
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self.epoch = 0
+        self._writes = deque(maxlen=self.WRITE_LOG_SIZE)     # (epoch, item id, lowercased name)
+        self._entries = OrderedDict()       # key -> (expires_at, etag, body, ids)
+        self._by_id = defaultdict(set)      # item id -> keys of the entries holding it
+        self._name_keys = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+
+    @staticmethod
+    def key(item_id, name, mode, limit=0, cursor=""):
+        return (item_id, name.lower(), mode.upper(), limit, cursor)
+
+
+    @staticmethod
+    def etag(body):
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+    @staticmethod
+    def matches(if_none_match, etag):
+
+        # If-None-Match uses the weak comparison: W/ prefixes are ignored, "*" matches anything
+        if not if_none_match:
+            return False
+
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+    def get(self, key):
+
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._forget(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+
+    @staticmethod
+    def matches_name(key, name):
+
+        # whether a name search could match an item named `name` (lowercased)
+        _, term, mode, _, _ = key
+        return bool(term) and (mode == "TEXT" or (mode == "PREFIX" and name.startswith(term)) or (mode == "SUBSTRING" and term in name))
+
+
+    def _stale(self, key, ids, epoch):
+
+        # writes since epoch, all of them have to still be in the log
+        recent = [write for write in self._writes if write[0] > epoch]
+        if len(recent) < self.epoch - epoch:
+            return True
+
+        return any(item_id in ids or (name and self.matches_name(key, name)) for _, item_id, name in recent)
+
+
+    def put(self, key, body, ids, epoch):
+
+        # skipped when a write made while the lookup was in flight would have invalidated it
+        if self.ttl <= 0 or self._stale(key, ids, epoch):
+            return
+
+        if key in self._entries:
+            self._forget(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, self.etag(body), body, ids)
+        for item_id in ids:
+            self._by_id[item_id].add(key)
+        if key[1]:
+            self._name_keys.add(key)
+
+        while len(self._entries) > self.max_size:
+            self._forget(next(iter(self._entries)))
+
+
+    def _forget(self, key):
+
+        _, _, _, ids = self._entries.pop(key)
+
+        for item_id in ids:
+            keys = self._by_id.get(item_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_id[item_id]
+
+        self._name_keys.discard(key)
+
+
+    def invalidate(self, item_id, name=""):
+
+        # entries holding the id (its own lookup included) and, for a new name, every search it could now match.
+        # Only found results are cached, so a new id cannot turn a cached answer stale.
+        name = name.lower()
+        self.epoch += 1
+        self._writes.append((self.epoch, item_id, name))
+        stale = set(self._by_id.get(item_id, ()))
+
+        if name:
+            stale.update(key for key in self._name_keys if self.matches_name(key, name))
+
+        for key in stale:
+            if key in self._entries:
+                self._forget(key)
+
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified, "size": len(self._entries), "ttl_seconds": self.ttl}
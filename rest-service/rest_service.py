@@ -1,14 +1,18 @@
 import os
 import logging
 import grpc
-from fastapi import FastAPI, HTTPException, Request, Response # type: ignore
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response # type: ignore
+from fastapi.responses import StreamingResponse # type: ignore
 import uvicorn # type: ignore
-import myitems_pb2
-import myitems_pb2_grpc
-from pybreaker import CircuitBreaker, CircuitBreakerError # type: ignore
 import asyncio
+import myitems_pb2
+from resilience import CircuitBreakerError, ResiliencePolicy, is_transient, write_not_applied
+from channels import ChannelManager
+from write_queue import QueueFull, WriteQueue
+from response_cache import ResponseCache
 import json
 import warnings
+from contextlib import asynccontextmanager
 
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -16,30 +20,337 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-app = FastAPI()
-
 
 # gRPC Setup
 GRPC_HOST = os.getenv("GRPC_HOST", "localhost")
 GRPC_PORT = os.getenv("GRPC_PORT", "50051")
 GRPC_ADDRESS = f"{GRPC_HOST}:{GRPC_PORT}"
 
-gRPC_channel = grpc.insecure_channel(GRPC_ADDRESS)
-gRPC_methods = myitems_pb2_grpc.ItemServiceStub(gRPC_channel)
+# Long-lived grpc.aio channels shared by all handlers, opened at startup and closed at shutdown
+GRPC_CHANNEL_POOL_SIZE = int(os.getenv("GRPC_CHANNEL_POOL_SIZE", 2))
+GRPC_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),              # ping idle connections so dead ones are noticed
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.http2.bdp_probe", 1),                    # dynamic HTTP/2 flow-control window
+    ("grpc.use_local_subchannel_pool", 1),          # each pooled channel keeps its own TCP connection
+    ("grpc.initial_reconnect_backoff_ms", 500),     # background reconnect back-off, capped at 5 sec
+    ("grpc.min_reconnect_backoff_ms", 500),
+    ("grpc.max_reconnect_backoff_ms", 5000),
+]
+
+
+grpc_channels = ChannelManager(GRPC_ADDRESS, GRPC_CHANNEL_POOL_SIZE, GRPC_CHANNEL_OPTIONS)
+
+
+# Request Queuing Setup
+# Single-item writes that cannot reach the gRPC-service are persisted and answered with 202 + ticket,
+# a background drainer replays them in order (adds batched through AddItems) once a channel is READY
+WRITE_QUEUE_PATH = os.getenv("WRITE_QUEUE_PATH", "data/write_queue.db")
+WRITE_QUEUE_MAX_DEPTH = int(os.getenv("WRITE_QUEUE_MAX_DEPTH", 10000))
+WRITE_QUEUE_BATCH_SIZE = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", 100))
+WRITE_QUEUE_DRAIN_INTERVAL = float(os.getenv("WRITE_QUEUE_DRAIN_INTERVAL", 1.0))
+
+write_queue = WriteQueue(WRITE_QUEUE_PATH, WRITE_QUEUE_MAX_DEPTH)
+
+
+# Response Cache Setup
+# Serialized GET /items/ bodies with their ETag, kept for RESPONSE_CACHE_TTL seconds (0 disables it)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 2.0))
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", 10000))
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_SIZE)
+
+# Deadline of an NDJSON name search stream, long enough for broad searches to be forwarded in full
+NDJSON_STREAM_TIMEOUT = float(os.getenv("NDJSON_STREAM_TIMEOUT", 30.0))
+
+
+@asynccontextmanager
+async def lifespan(app):
 
+    grpc_channels.open()
+    drainer = asyncio.create_task(drain_write_queue())
 
-# Circuit Breaker Setup
-breaker = CircuitBreaker(fail_max=3, reset_timeout=6)
+    if write_queue.depth():
+        logging.info(f"{write_queue.depth()} queued write(s) waiting from a previous run.")
+
+    yield
+
+    drainer.cancel()
+    await asyncio.gather(drainer, return_exceptions=True)
+    await grpc_channels.close()
+    write_queue.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+# Circuit Breaker & Retry Setup
+# One policy per gRPC method, each with its own breaker and retry budget. Reads are idempotent and retried
+# on every transient error, writes (and write queuing) only when the write certainly was not applied (write_not_applied).
+# Open breakers only let a half-open trial through once the channel manager reports a READY channel.
+# Back-off is jittered exponential: uniform in [0, 1 sec] before the 1st retry, [0, 2 sec] before the 2nd.
 MAX_RETRIES = 2
 
+policies = {
+    "GetItem": ResiliencePolicy("GetItem", idempotent=True, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+    "GetItems": ResiliencePolicy("GetItems", idempotent=True, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+    "AddItem": ResiliencePolicy("AddItem", idempotent=False, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+    "AddItems": ResiliencePolicy("AddItems", idempotent=False, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+    "UpdateItem": ResiliencePolicy("UpdateItem", idempotent=False, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+    "DeleteItem": ResiliencePolicy("DeleteItem", idempotent=False, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+    "DeleteItems": ResiliencePolicy("DeleteItems", idempotent=False, max_retries=MAX_RETRIES, is_available=grpc_channels.is_connected),
+}
+
+
+async def call_grpc(method, request, timeout):
+
+    # every attempt picks the next pooled channel, so a retry can land on a healthy connection.
+    # A failure on a channel that was never READY during the call is flagged undelivered (see write_not_applied)
+    async def attempt():
+
+        stub, may_have_arrived = grpc_channels.call_stub()
+
+        try:
+            return await getattr(stub, method)(request, timeout=timeout)
+
+        except grpc.RpcError as e:
+            e.undelivered = not may_have_arrived()
+            raise
+
+    return await policies[method].call(attempt)
+
+
+async def call_grpc_stream(method, request, timeout):
+
+    # server streams are collected inside the attempt, a retry restarts the whole stream
+    async def attempt():
+        return [response async for response in getattr(grpc_channels.stub(), method)(request, timeout=timeout)]
+
+    return await policies[method].call(attempt)
+
+
+async def open_grpc_stream(method, request, timeout):
+
+    # the policy covers the call up to its first message, the rest is forwarded by the caller as it arrives
+    # (a retry after bytes went out to the client is not possible)
+    async def attempt():
+        call = getattr(grpc_channels.stub(), method)(request, timeout=timeout)
+        first = await call.read()
+
+        # a result=False message is the last one, reading on raises its status (NOT_FOUND, UNAVAILABLE, ...)
+        # inside the attempt, so transient codes are retried and counted by the breaker
+        if first is not grpc.aio.EOF and not first.result:
+            await call.read()
+
+        return call, first
+
+    return await policies[method].call(attempt)
+
+
+def build_item(item_id, name=""):
+
+    # the Item sent (or queued) for a write, out-of-range ids are rejected before anything is queued
+    try:
+        return myitems_pb2.Item(id=item_id, name=name)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid item id {item_id}.")
+
+
+def write_failure(error):
+
+    # failed write that is neither queued nor retried: it may have been applied
+    if is_transient(error):
+        return HTTPException(status_code=503, detail=f"gRPC-service failed during the write, it may have been applied: {error.details()}")
+
+    return grpc_failure(error)
+
+
+def grpc_failure(error):
+
+    # transient errors left after the retries -> 503, anything else -> 500
+    if is_transient(error):
+        return HTTPException(status_code=503, detail=f"gRPC-service unavailable: {error.details()}")
+
+    return HTTPException(status_code=500, detail=f"gRPC-service failure: {error.details()}")
+
+
+# --- Request Queuing ---
+async def queue_write(op, item_id, name=""):
+
+    try:
+        ticket = await asyncio.to_thread(write_queue.enqueue, op, {"id": item_id, "name": name})
+
+    except QueueFull as e:
+
+        content = {"status": "error", "message": f"Service unavailable and {e} Please try again later."}
+        logging.warning(f"Write queue full, rejected {op} for id={item_id}.")
+        return Response(content=json.dumps(content) + "\n", status_code=503, media_type="application/json")
+
+    logging.info(f"Queued {op} for id={item_id} as ticket {ticket} (depth {write_queue.depth()}).")
+    content = {
+        "message": "gRPC-service unavailable, request queued and will be applied in order.",
+        "ticket": ticket,
+        "status_url": f"/queue/{ticket}",
+    }
+    return Response(content=json.dumps(content) + "\n", status_code=202, media_type="application/json")
+
+
+def replay_failure(error):
+
+    # answer of a queued write that is not replayed again, None when it certainly was not applied (drain pauses).
+    # A write that may have been applied is not sent twice, its outcome is unknown
+    if write_not_applied(error):
+        return None
+
+    if is_transient(error):
+        return {"http_status": 503, "detail": f"gRPC-service failed during the write, it may have been applied: {error.details()}"}
+
+    status = {grpc.StatusCode.NOT_FOUND: 404, grpc.StatusCode.ALREADY_EXISTS: 409, grpc.StatusCode.INVALID_ARGUMENT: 400}
+    return {"http_status": status.get(error.code(), 500), "detail": error.details()}
+
+
+def queue_is_active():
+    # once anything is queued, new writes queue behind it so they are applied in arrival order
+    return write_queue.depth() > 0
+
+
+# Queued payloads that are no valid Item (queued before ids were validated) can never be replayed
+INVALID_QUEUED_WRITE = {"http_status": 400, "detail": "Invalid item id, the write can not be applied."}
+
+
+def queued_item(payload):
+    try:
+        return myitems_pb2.Item(id=payload["id"], name=payload["name"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def replay_writes(writes):
+
+    # Replays queued writes in order, consecutive AddItem requests as one AddItems call.
+    # Returns the number of finished writes, stops at the first write the backend cannot take yet.
+    finished = 0
+    index = 0
+
+    while index < len(writes):
+
+        ticket, op, payload = writes[index]
+
+        try:
+
+            if op == "AddItem":
+
+                group = []
+                outcomes = []
+                while index < len(writes) and writes[index][1] == "AddItem":
+                    item = queued_item(writes[index][2])
+                    if item is None:
+                        outcomes.append((writes[index][0], "failed", INVALID_QUEUED_WRITE))
+                    else:
+                        group.append((writes[index], item))
+                    index += 1
+
+                if group:
+
+                    batch = myitems_pb2.ItemBatch(items=[item for _, item in group])
+
+                    try:
+                        response = await call_grpc("AddItems", batch, timeout=5.0)
+
+                    except grpc.RpcError as e:
+                        failure = replay_failure(e)
+                        if failure is None:
+                            raise
+                        outcomes += [(t, "failed", failure) for (t, _, _), _ in group]
+
+                    else:
+                        outcomes += [
+                            (t, "done", {"http_status": 201, "item": p}) if res.result
+                            else (t, "failed", {"http_status": 409, "detail": "Item with ID or name already exists."})
+                            for ((t, _, p), _), res in zip(group, response.results)
+                        ]
+
+            else:
+
+                index += 1
+                request = queued_item(payload)
+
+                try:
+                    if request is None:
+                        outcomes = [(ticket, "failed", INVALID_QUEUED_WRITE)]
+                    else:
+                        await call_grpc(op, request, timeout=2.0)
+                        outcomes = [(ticket, "done", {"http_status": 200, "item": payload})]
+
+                except grpc.RpcError as e:
+
+                    # a write rejected for good or maybe applied is finished, it must not hold up the queue behind it
+                    failure = replay_failure(e)
+                    if failure is None:
+                        raise
+                    outcomes = [(ticket, "failed", failure)]
+
+
+        except (CircuitBreakerError, grpc.RpcError) as e:
+            logging.warning(f"Write queue drain paused: {e}")
+            return finished
+
+        await asyncio.to_thread(write_queue.finish, outcomes)
+        finished += len(outcomes)
+
+        for _, status, result in outcomes:
+            if status == "done":
+                response_cache.invalidate(result["item"]["id"], result["item"]["name"])
+
+    return finished
+
+
+async def drain_write_queue():
+
+    while True:
+
+        try:
+
+            if not write_queue.depth() or not grpc_channels.is_connected():
+                await asyncio.sleep(WRITE_QUEUE_DRAIN_INTERVAL)
+                continue
+
+            writes = await asyncio.to_thread(write_queue.peek, WRITE_QUEUE_BATCH_SIZE)
+            finished = await replay_writes(writes)
+
+            if finished:
+                logging.info(f"Replayed {finished} queued write(s), {write_queue.depth()} left.")
+            else:
+                await asyncio.sleep(WRITE_QUEUE_DRAIN_INTERVAL)
+
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logging.error(f"Write queue drainer error: {e}")
+            await asyncio.sleep(WRITE_QUEUE_DRAIN_INTERVAL)
+
+
+
+@app.exception_handler(CircuitBreakerError)
+async def circuit_open_handler(request: Request, exc: CircuitBreakerError):
+
+    content = {
+        "status": "error",
+        "message": "Service unavailable. The circuit breaker is open. Please try again later."
+    }
+    logging.warning(f"{exc} Rejected {request.method} {request.url.path}.")
+    return Response(content=json.dumps(content) + "\n", status_code=503, media_type="application/json")
+
 
 # --- FastAPI REST-server Setup ---
 
 @app.post("/items")
 async def add_item(request: Request):
 
-    global gRPC_channel, gRPC_methods
-    delay = 1
     body = await request.json()
     item_id = body.get("id")
     name = body.get("name")
@@ -47,70 +358,235 @@ async def add_item(request: Request):
     if not all([isinstance(item_id, int), name]):
         raise HTTPException(status_code=400, detail="Request must include 'id' and 'name'.")
 
-    grpc_request = myitems_pb2.Item(id=item_id, name=name) # type: ignore
+    grpc_request = build_item(item_id, name)
 
-    for attempt in range(MAX_RETRIES + 1):
+    if queue_is_active():
+        return await queue_write("AddItem", item_id, name)
 
-        try:
-            
-            if breaker.current_state == 'CLOSED':
-                
-                response = breaker.call(gRPC_methods.AddItem, grpc_request, timeout=1.0)
-            
-            else:
-                
-                # Only create new channel when CircuitBreaker is HALF_OPEN
-                gRPC_new_channel = grpc.insecure_channel(GRPC_ADDRESS)
-                gRPC_methods = myitems_pb2_grpc.ItemServiceStub(gRPC_new_channel)
-                response = breaker.call(gRPC_methods.AddItem, grpc_request, timeout=1.0)
-            
-            
-            if response.result:
-                
-                content = {"message": "Item added successfully.", "item": {"id": response.added_item.id, "name": response.added_item.name}}
-                return Response(content=json.dumps(content) + "\n", status_code=201, media_type="application/json")
+    try:
 
-            else:
-                raise HTTPException(status_code=409, detail="Item with ID or name already exists.")
-                
+        # breaker, retries and back-off come from the AddItem policy, all awaited on the shared aio channel pool
+        response = await call_grpc("AddItem", grpc_request, timeout=1.0)
 
-        except (CircuitBreakerError):
 
-            content = {
-                "status": "error",
-                "message": "Service unavailable. The circuit breaker is open. Please try again later."
-            }
-            logging.warning(f"gRPC-service unavailable. Calls will no longer be accepted. Please try again later. {body}")
-            return Response(content=json.dumps(content) + "\n", status_code=503, media_type="application/json")           
+    except (CircuitBreakerError):
 
+        logging.warning(f"gRPC-service unavailable, circuit breaker open. Queuing {body}")
+        return await queue_write("AddItem", item_id, name)
 
-        except grpc.RpcError as err:
-            
-            logging.warning(f"Call {attempt + 1} failed")
-            await asyncio.sleep(delay)
-            delay *= 2
-    
-    
+
+    except grpc.RpcError as e:
+
+        if write_not_applied(e):
+            return await queue_write("AddItem", item_id, name)
+
+        raise write_failure(e)
+
+
+    if response.result:
+
+        response_cache.invalidate(item_id, name)
+        content = {"message": "Item added successfully.", "item": {"id": response.added_item.id, "name": response.added_item.name}}
+        return Response(content=json.dumps(content) + "\n", status_code=201, media_type="application/json")
+
+    else:
+        raise HTTPException(status_code=409, detail="Item with ID or name already exists.")
+
+
+
+@app.get("/health")
+async def health():
+
+    # gRPC connectivity as seen by the channel manager plus the state of every breaker
+    content = {
+        "grpc": grpc_channels.state(),
+        "breakers": {name: policy.breaker.current_state for name, policy in policies.items()},
+    }
+    status_code = 200 if grpc_channels.is_connected() else 503
+    return Response(content=json.dumps(content) + "\n", status_code=status_code, media_type="application/json")
+
+
+
+@app.get("/queue/{ticket}")
+async def queue_status(ticket: str):
+
+    status = await asyncio.to_thread(write_queue.status, ticket)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket} not found.")
+
+    return status
+
+
+@app.get("/metrics")
+async def metrics():
+    return {"write_queue": await asyncio.to_thread(write_queue.metrics), "response_cache": response_cache.stats()}
+
+
+
+# --- Batch endpoints (declared before /items/{item_id} so 'batch' is not parsed as an id) ---
+
+@app.post("/items/batch")
+async def add_items(request: Request):
+
+    try:
+        body = await request.json()
+        items = body.get("items")
+
+        if not isinstance(items, list) or not all(isinstance(item, dict) and isinstance(item.get("id"), int) and item.get("name") for item in items):
+            raise HTTPException(status_code=400, detail="Request must include 'items', a list of objects with 'id' and 'name'.")
+
+        batch = myitems_pb2.ItemBatch(items=[myitems_pb2.Item(id=item["id"], name=item["name"]) for item in items])
+        response = await call_grpc("AddItems", batch, timeout=5.0)
+
+        results = [{"id": res.added_item.id, "name": res.added_item.name, "added": res.result} for res in response.results]
+        for res in response.results:
+            if res.result:
+                response_cache.invalidate(res.added_item.id, res.added_item.name)
+        return {"message": f"Added {sum(res['added'] for res in results)} of {len(results)} item(s).", "results": results}
+
+
+    except grpc.RpcError as e:
+
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+
+        else:
+            raise write_failure(e)
+
+
+@app.get("/items/batch")
+async def get_items_batch(ids: list[int] = Query(...)):
+
+    try:
+
+        batch = myitems_pb2.ItemBatch(items=[myitems_pb2.Item(id=item_id) for item_id in ids])
+        response = await call_grpc("GetItems", batch, timeout=5.0)
+
+        results = [{"id": res.requested_item.id, "name": res.requested_item.name, "found": res.result} for res in response.results]
+        return {"message": f"Found {sum(res['found'] for res in results)} of {len(results)} item(s).", "results": results}
+
+
+    except grpc.RpcError as e:
+
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+
+        else:
+            raise grpc_failure(e)
+
+
+@app.delete("/items/batch")
+async def delete_items(ids: list[int] = Query(...)):
+
+    try:
+
+        batch = myitems_pb2.ItemBatch(items=[myitems_pb2.Item(id=item_id) for item_id in ids])
+        response = await call_grpc("DeleteItems", batch, timeout=5.0)
+
+        results = [{"id": res.deleted_item.id, "name": res.deleted_item.name, "deleted": res.result} for res in response.results]
+        for res in response.results:
+            if res.result:
+                response_cache.invalidate(res.deleted_item.id)
+        return {"message": f"Deleted {sum(res['deleted'] for res in results)} of {len(results)} item(s).", "results": results}
+
+
+    except grpc.RpcError as e:
+
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+
+        else:
+            raise write_failure(e)
+
+
+def cached_response(etag, body, if_none_match):
+
+    # ETag on every answer, 304 without a body when the client already holds this version
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if ResponseCache.matches(if_none_match, etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def ndjson_items(call, response):
+
+    # one JSON object per line, written as each GetItemResponse arrives, so memory stays bounded
+    # by the HTTP/2 flow-control window whatever the number of matches
+    try:
+        next_cursor = ""
+
+        while response is not grpc.aio.EOF:
+            if response.result:
+                yield json.dumps({"id": response.requested_item.id, "name": response.requested_item.name}) + "\n"
+            next_cursor = response.next_page_token or next_cursor
+            response = await call.read()
+
+        # paged search: the cursor of the next page comes last
+        if next_cursor:
+            yield json.dumps({"next_cursor": next_cursor}) + "\n"
+
+    except grpc.RpcError as e:
+        # headers are already sent, the failure can only be reported in-band
+        logging.warning(f"GetItem stream interrupted: {e.code().name} {e.details()}")
+        yield json.dumps({"error": e.code().name, "detail": e.details()}) + "\n"
+
+    finally:
+        call.cancel()
 
 
 @app.get("/items/")
-def get_items(item_id: int = 0, name: str = ""):
+async def get_items(item_id: int = 0, name: str = "", mode: str = "substring", limit: int = 0, cursor: str = "", if_none_match: str | None = Header(None), accept: str | None = Header(None)):
 
     try:
 
         if not item_id and not name:
             raise HTTPException(status_code=400, detail="Provide 'id' or 'name'.")
 
-        with grpc.insecure_channel(GRPC_ADDRESS) as channel:
-            stub = myitems_pb2_grpc.ItemServiceStub(channel)
-            request = myitems_pb2.Item(id=item_id, name=name)
-            responses = stub.GetItem(request, timeout=2.0)
-            results = [{"id": resp.requested_item.id, "name": resp.requested_item.name} for resp in responses if resp.result]
+        # name search mode: substring (default), prefix or text (word search)
+        if mode.upper() not in myitems_pb2.SearchMode.keys():
+            raise HTTPException(status_code=400, detail="'mode' must be one of 'substring', 'prefix' or 'text'.")
+
+        # limit > 0 pages the name search, 'cursor' is the 'next_cursor' of the previous page
+        request = myitems_pb2.GetItemRequest(id=item_id, name=name, mode=myitems_pb2.SearchMode.Value(mode.upper()), limit=limit, page_token=cursor)
+
+        # Accept: application/x-ndjson streams matches as they arrive instead of buffering the whole result
+        if accept and "application/x-ndjson" in accept:
+
+            call, first = await open_grpc_stream("GetItem", request, timeout=NDJSON_STREAM_TIMEOUT)
 
-            if not results:
+            # failures (NOT_FOUND, INVALID_ARGUMENT, ...) were raised by open_grpc_stream, an empty stream is no match
+            if first is grpc.aio.EOF or not first.result:
+                call.cancel()
                 raise HTTPException(status_code=404, detail="No items found.")
 
-            return {"message": "Items retrieved successfully.", "items": results}
+            return StreamingResponse(ndjson_items(call, first), media_type="application/x-ndjson")
+
+        # hot lookups are answered from the response cache without leaving the REST process
+        key = ResponseCache.key(item_id, name, mode, limit, cursor)
+        cached = response_cache.get(key)
+
+        if cached is not None:
+            return cached_response(*cached, if_none_match)
+
+        epoch = response_cache.epoch
+        responses = await call_grpc_stream("GetItem", request, timeout=2.0)
+        results = [{"id": resp.requested_item.id, "name": resp.requested_item.name} for resp in responses if resp.result]
+
+        if not results:
+            raise HTTPException(status_code=404, detail="No items found.")
+
+        content = {"message": "Items retrieved successfully.", "items": results}
+
+        if limit:
+            content["next_cursor"] = next((resp.next_page_token for resp in responses if resp.next_page_token), None)
+
+        body = json.dumps(content, separators=(",", ":")).encode()
+        response_cache.put(key, body, {item["id"] for item in results}, epoch)
+        return cached_response(ResponseCache.etag(body), body, if_none_match)
 
 
     except grpc.RpcError as e:
@@ -118,8 +594,11 @@ def get_items(item_id: int = 0, name: str = ""):
         if e.code() == grpc.StatusCode.NOT_FOUND:
             raise HTTPException(status_code=404, detail=e.details())
 
+        elif e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+
         else:
-            raise HTTPException(status_code=500, detail=f"gRPC-service failure: {e.details()}")
+            raise grpc_failure(e)
 
 
 @app.put("/items/{item_id}")
@@ -132,13 +611,20 @@ async def update_item(item_id: int, request: Request):
         if not new_name:
             raise HTTPException(status_code=400, detail="The 'name' field is required in the request body.")
 
-        with grpc.insecure_channel(GRPC_ADDRESS) as channel:
-            stub = myitems_pb2_grpc.ItemServiceStub(channel)
-            item_to_update = myitems_pb2.Item(id=item_id, name=new_name)
-            response = stub.UpdateItem(item_to_update, timeout=2.0)
+        item_to_update = build_item(item_id, new_name)
 
-            if response.result:
-                return {"message": f"Item {item_id} updated successfully.", "old_item": {"id": response.old_item.id, "name": response.old_item.name}, "new_item": {"id": response.new_item.id, "name": response.new_item.name}}
+        if queue_is_active():
+            return await queue_write("UpdateItem", item_id, new_name)
+
+        response = await call_grpc("UpdateItem", item_to_update, timeout=2.0)
+
+        if response.result:
+            response_cache.invalidate(item_id, new_name)
+            return {"message": f"Item {item_id} updated successfully.", "old_item": {"id": response.old_item.id, "name": response.old_item.name}, "new_item": {"id": response.new_item.id, "name": response.new_item.name}}
+
+
+    except CircuitBreakerError:
+        return await queue_write("UpdateItem", item_id, new_name)
 
 
     except grpc.RpcError as e:
@@ -149,21 +635,31 @@ async def update_item(item_id: int, request: Request):
         elif e.code() == grpc.StatusCode.ALREADY_EXISTS:
             raise HTTPException(status_code=409, detail=e.details())
 
+        elif write_not_applied(e):
+            return await queue_write("UpdateItem", item_id, new_name)
+
         else:
-            raise HTTPException(status_code=500, detail=f"gRPC-service failure: {e.details()}")
+            raise write_failure(e)
 
 
 @app.delete("/items/{item_id}", status_code=200)
-def delete_item(item_id: int):
+async def delete_item(item_id: int):
     try:
 
-        with grpc.insecure_channel(GRPC_ADDRESS) as channel:
-            stub = myitems_pb2_grpc.ItemServiceStub(channel)
-            request = myitems_pb2.Item(id=item_id)
-            response = stub.DeleteItem(request, timeout=2.0)
+        request = build_item(item_id)
 
-            if response.result:
-                return {"message": "Successfully deleted item.", "deleted_item": {"id": response.deleted_item.id, "name": response.deleted_item.name}}
+        if queue_is_active():
+            return await queue_write("DeleteItem", item_id)
+
+        response = await call_grpc("DeleteItem", request, timeout=2.0)
+
+        if response.result:
+            response_cache.invalidate(item_id)
+            return {"message": "Successfully deleted item.", "deleted_item": {"id": response.deleted_item.id, "name": response.deleted_item.name}}
+
+
+    except CircuitBreakerError:
+        return await queue_write("DeleteItem", item_id)
 
 
     except grpc.RpcError as e:
@@ -171,8 +667,11 @@ def delete_item(item_id: int):
         if e.code() == grpc.StatusCode.NOT_FOUND:
             raise HTTPException(status_code=404, detail=e.details())
 
+        elif write_not_applied(e):
+            return await queue_write("DeleteItem", item_id)
+
         else:
-            raise HTTPException(status_code=500, detail=f"gRPC-service failure: {e.details()}")
+            raise write_failure(e)
 
 
 
@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class QueueFull(Exception):
+    pass
+
+
+
+
+# --- Durable Write Queue ---
+class WriteQueue:
+
+    # Bounded FIFO of write requests persisted in a local SQLite file (WAL journal), so writes accepted
+    # with 202 survive a restart of the rest-service. Rows keep their ticket after being drained
+    # so clients can look up the outcome, finished rows older than `retention` seconds are pruned.
+    # Methods are blocking (one short SQLite transaction each), call them through asyncio.to_thread.
+
+    def __init__(self, path, max_depth, retention=3600):
+
+        self.path = path
+        self.max_depth = max_depth
+        self.retention = retention
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS writes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticket TEXT UNIQUE NOT NULL,
+                op TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                result TEXT,
+                enqueued_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS writes_status ON writes (status, seq)")
+
+        # metrics, counted since startup
+        self.enqueued_total = 0
+        self.drained_total = 0
+        self.failed_total = 0
+        self._drained_at = deque(maxlen=10000)
+        self._depth = self._count_queued()
+
+
+    def _count_queued(self):
+        return self._db.execute("SELECT COUNT(*) FROM writes WHERE status = 'queued'").fetchone()[0]
+
+
+    def depth(self):
+        return self._depth
+
+
+    def enqueue(self, op, payload):
+
+        with self._lock:
+
+            if self._depth >= self.max_depth:
+                raise QueueFull(f"Write queue is full ({self.max_depth} requests).")
+
+            ticket = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO writes (ticket, op, payload, enqueued_at) VALUES (?, ?, ?, ?)",
+                (ticket, op, json.dumps(payload), time.time())
+            )
+            self._depth += 1
+            self.enqueued_total += 1
+            return ticket
+
+
+    def peek(self, limit):
+
+        # oldest queued writes, in arrival order
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT ticket, op, payload FROM writes WHERE status = 'queued' ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+
+        return [(ticket, op, json.loads(payload)) for ticket, op, payload in rows]
+
+
+    def finish(self, outcomes):
+
+        # outcomes: list of (ticket, status, result) with status 'done' or 'failed', written in one transaction
+        now = time.time()
+
+        with self._lock:
+
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE writes SET status = ?, result = ?, finished_at = ? WHERE ticket = ? AND status = 'queued'",
+                [(status, json.dumps(result), now, ticket) for ticket, status, result in outcomes]
+            )
+            self._db.execute("DELETE FROM writes WHERE status != 'queued' AND finished_at < ?", (now - self.retention,))
+            self._db.execute("COMMIT")
+
+            self._depth = self._count_queued()
+
+            for _, status, _ in outcomes:
+                self._drained_at.append(now)
+                if status == "done":
+                    self.drained_total += 1
+                else:
+                    self.failed_total += 1
+
+
+    def status(self, ticket):
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT op, payload, status, result, enqueued_at, finished_at FROM writes WHERE ticket = ?", (ticket,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        op, payload, status, result, enqueued_at, finished_at = row
+        return {
+            "ticket": ticket,
+            "op": op,
+            "request": json.loads(payload),
+            "status": status,
+            "result": json.loads(result) if result else None,
+            "enqueued_at": enqueued_at,
+            "finished_at": finished_at,
+        }
+
+
+    def metrics(self, window=60):
+
+        with self._lock:
+
+            now = time.time()
+            oldest = self._db.execute("SELECT MIN(enqueued_at) FROM writes WHERE status = 'queued'").fetchone()[0]
+
+            return {
+                "depth": self._depth,
+                "max_depth": self.max_depth,
+                "oldest_age_seconds": round(now - oldest, 3) if oldest else 0,
+                "enqueued_total": self.enqueued_total,
+                "drained_total": self.drained_total,
+                "failed_total": self.failed_total,
+                "drain_rate_per_second": round(sum(1 for t in self._drained_at if now - t <= window) / window, 3),
+            }
+
+
+    def close(self):
+        with self._lock:
+            self._db.close()